@@ -1,157 +1,221 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, Request, render_template, request, send_file, jsonify, Response, stream_with_context, url_for
+import io
 import logging
-from io import BytesIO
+import json
 import tempfile
 import os
-from jinja2 import Template
 
 from config import get_config
-from utils import ExcelProcessor, PDFGenerator, DataValidator
+from utils import ExcelProcessor, PDFGenerator, DataValidator, convert_to_words
+from batch import BatchProcessor, empty_result
+from output_store import OutputStore
+from template_registry import get_template_registry
+from incremental import IncrementalRenderer, pdf_merge_available
+from warmup import WarmUp
+from chunked_upload import ChunkedUploadManager
+from ingest import UploadIngestor, verify_file
+from zip_stream import stream_zip, stream_gzip, encode_chunks, map_as_completed, receipt_file_name, safe_file_name, unique_name
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app with configuration
-app = Flask(__name__)
 config = get_config()
+upload_ingestor = UploadIngestor(config)
+
+class IngestingRequest(Request):
+    """Request that validates and hashes uploaded files while they stream in"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return upload_ingestor.open(filename, content_length)
+
+app = Flask(__name__)
+app.request_class = IngestingRequest
 app.config.from_object(config)
 
 # Initialize processors
 excel_processor = ExcelProcessor(config)
 pdf_generator = PDFGenerator(config)
 data_validator = DataValidator()
+batch_processor = BatchProcessor(config)
+output_store = OutputStore(config)
+upload_manager = ChunkedUploadManager(config)
 
-# Pre-compiled template for better performance
-receipt_template = Template("""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=210mm, height: 297mm">
-    <title>Hand Receipt (RPWA 28)</title>
-    <style>
-        body { font-family: sans-serif; margin: 0; }
-        @page {
-            margin: 10mm;  /* Page margins */
-        }
-        .container {
-            width: 210mm !important; /* Added !important */
-            min-height: 297mm;
-            margin: 10mm 20mm !important; /* Added !important */
-            border: 2px solid #ccc !important;
-            padding: 0mm; /* Changed to 0mm */
-            box-sizing: border-box;
-            position: relative;
-            page-break-before: always;
-        }
-        .container:first-child {
-            page-break-before: auto;
-        }
-        .header { text-align: center; margin-bottom: 2px; }
-        .details { margin-bottom: 1px; }
-        .amount-words { font-style: italic; }
-        .signature-area { width: 100%; border-collapse: collapse; margin-top: 20px; }
-        .signature-area td, .signature-area th {
-            border: 1px solid #ccc !important;
-            padding: 5px;
-            text-align: left;
-        }
-        .offices { width: 100%; border-collapse: collapse; margin-top: 20px; }
-        .offices td, .offices th {
-            border: 1px solid black !important;
-            padding: 5px;
-            text-align: left;
-            word-wrap: break-word;
-        }
-        .input-field { border-bottom: 1px dotted #ccc; padding: 3px; width: calc(100% - 10px); display: inline-block; }
-        .seal-container { position: absolute; left: 10mm; bottom: 10mm; width: 40mm; height: 25mm; z-index: 10; }
-        .seal { max-width: 100%; max-height: 100%; text-align: center; line-height: 40mm; color: blue; display: flex; justify-content: space-around; align-items: center; }
-        .bottom-left-box { 
-            position: absolute; bottom: 40mm; left: 40mm; 
-            border: 2px solid blue; padding: 10px; 
-            width: 450px; text-align: left; height: 55mm; 
-            color: blue; 
-        }
-        .bottom-left-box p { margin: 3px 0; }
-         @media print {
-            .container {
-                border: none;
-                width: 210mm;
-                min-height: 297mm;
-                margin: 0;
-                padding: 0;
-            }
-        }
-    </style>
-</head>
-<body>
-    {% for receipt in receipts %}
-    <div class="container">
-        <div class="header">
-            <h2>Payable to: - {{ receipt.payee }} ( Electric Contractor)</h2>
-            <h2>HAND RECEIPT (RPWA 28)</h2>
-            <p>(Referred to in PWF&A Rules 418,424,436 & 438)</p>
-            <p>Division - PWD Electric Division, Udaipur</p>
-        </div>
-        <div class="details">
-            <p>(1)Cash Book Voucher No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Date &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</p>
-            <p>(2)Cheque No. and Date &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</p>
-            <p>(3) Pay for ECS Rs.{{ receipt.amount }}/- (Rupees <span class="amount-words">{{ receipt.amount_words }} Only</span>)</p>
-            <p>(4) Paid by me</p>
-            <p>(5) Received from The Executive Engineer PWD Electric Division, Udaipur the sum of Rs. {{ receipt.amount }}/- (Rupees <span class="amount-words">{{ receipt.amount_words }} Only</span>)</p>
-            <p> Name of work for which payment is made: <span id="work-name" class="input-field">{{ receipt.work }}</span></p>
-            <p> Chargeable to Head:- 8443 [EMD- Refund] </p>
-            <table class="signature-area">
-                <tr>
-                    <td>Witness</td>
-                    <td>Stamp</td>
-                    <td>Signature of payee</td>
-                </tr>
-                <tr>
-                    <td>Cash Book No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;Page No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</td>
-                    <td></td>
-                    <td></td>
-                </tr>
-            </table>
-            <table class="offices">
-                <tr>
-                    <td>For use in the Divisional Office</td>
-                    <td>For use in the Accountant General's office</td>
-                </tr>
-                <tr>
-                    <td>Checked</td>
-                    <td>Audited/Reviewed</td>
-                </tr>
-                <tr>
-                    <td>Accounts Clerk</td>
-                    <td>DA &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Auditor &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Supdt. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; G.O.</td>
-                </tr>
-            </table>
-        </div>
-        <div class="seal-container">
-            <div class="seal">
-                <p></p>
-                <p></p>
-                <p></p>
-            </div>
-        </div>
-        <div class="bottom-left-box">
-                <p></p>
-                <p></p>
-                <p></p>
-            <p> Passed for Rs. {{ receipt.amount }}</p>
-            <p> In Words Rupees: {{ receipt.amount_words }} Only</p>
-            <p> Chargeable to Head:- 8443 [EMD- Refund]</p>
-            <div class="seal">
-                <p>Ar.&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;D.A.&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;E.E.</p>
-            </div>
-        </div>
-    </div>
-    {% endfor %}
-</body>
-</html>
-""")
+# Receipt formats are compiled once and shared through the template registry
+template_registry = get_template_registry(config)
+receipt_template = template_registry.format(config.DEFAULT_RECEIPT_FORMAT)
+
+# Re-uploaded ledgers only re-render changed receipts when pypdf can splice the pages
+incremental_renderer = IncrementalRenderer(config, output_store, pdf_generator, receipt_template)
+if not pdf_merge_available():
+    incremental_renderer = None
+    logger.info("pypdf is not installed; re-uploaded ledgers are rendered in full")
+
+def generate_receipts_pdf(receipts):
+    """Render receipts to a temporary PDF file, returning its path or None on failure"""
+    # Generate PDF with temporary file
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
+        pdf_file = tmp_file.name
+
+    # The template is rendered lazily and piped to wkhtmltopdf as it is produced
+    if not pdf_generator.generate_pdf(receipt_template.generate(receipts=receipts), pdf_file):
+        try:
+            os.unlink(pdf_file)
+        except OSError:
+            pass
+        return None
+    return pdf_file
+
+def send_pdf_file(pdf_file, download_name="receipts.pdf"):
+    """Move a generated PDF into the output store and send it as an attachment"""
+    try:
+        output_id = output_store.put_file(pdf_file, download_name, 'application/pdf')
+    finally:
+        # Clean up temporary file if it was not moved into the store
+        try:
+            os.unlink(pdf_file)
+        except OSError:
+            pass
+    return send_output(output_id)
+
+def send_output(output_id, as_attachment=True):
+    """Send a stored output with a content-hash ETag, honouring conditional and Range requests"""
+    output = output_store.get(output_id)
+    if output is None:
+        return config.ERROR_MESSAGES['output_not_found'], 404
+
+    response = send_file(
+        output["path"],
+        mimetype=output["mimetype"],
+        as_attachment=as_attachment,
+        download_name=output["download_name"],
+        conditional=True,
+        etag=output_id,
+        max_age=config.OUTPUT_MAX_AGE
+    )
+    # Receipts carry payee details, so only the user's browser may cache them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    response.headers['X-Output-Id'] = output_id
+    response.headers['Content-Location'] = url_for('get_output', output_id=output_id)
+    return response
+
+def read_api_records(max_rows: int):
+    """Parse a JSON array or NDJSON request body into a list of rows"""
+    content_type = (request.mimetype or '').lower()
+    records = []
+
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        # NDJSON is consumed line by line so the body is never parsed as one document
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(records) >= max_rows:
+                return None, config.ERROR_MESSAGES['too_many_rows'].format(max_rows=max_rows)
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                return None, config.ERROR_MESSAGES['invalid_json'].format(error=f"line {line_number}: {e}")
+        return records, ""
+
+    try:
+        payload = json.loads(request.get_data(cache=False) or b'null')
+    except ValueError as e:
+        return None, config.ERROR_MESSAGES['invalid_json'].format(error=str(e))
+
+    # Accept either a bare array or {"rows": [...]}
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        return None, config.ERROR_MESSAGES['invalid_json'].format(error="expected an array of rows")
+    if len(payload) > max_rows:
+        return None, config.ERROR_MESSAGES['too_many_rows'].format(max_rows=max_rows)
+    return payload, ""
+
+def ingested_upload(file):
+    """Return (stream, sha256, error, status) for an uploaded file, finishing ingestion checks.
+
+    Files rejected while they streamed in (too large, wrong signature) are
+    reported here, so only that file fails, not the whole form.
+    """
+    stream = file.stream
+    if not hasattr(stream, 'verify'):
+        # Not spooled by IngestingRequest (e.g. a test client passing a file object)
+        stream = upload_ingestor.open(file.filename)
+        for chunk in iter(lambda: file.stream.read(config.CHUNK_SIZE), b''):
+            stream.write(chunk)
+
+    error_msg = stream.verify()
+    if error_msg:
+        return None, None, error_msg, stream.status_code
+    return stream, stream.sha256, "", 200
+
+def parse_workbook(file_stream, all_sheets=False):
+    """Parse an uploaded workbook into receipts, returning (receipts, rejected rows, error)"""
+    if all_sheets:
+        return parse_all_sheets(file_stream)
+
+    # Process Excel file
+    df, error_msg = excel_processor.read_excel(file_stream)
+    if df is None:
+        return None, [], error_msg
+
+    # Find required columns
+    payee_col, amount_col, work_col, error_msg = excel_processor.find_columns(df)
+    if not all([payee_col, amount_col, work_col]):
+        return None, [], error_msg
+
+    # Process data
+    receipts, rejected = excel_processor.process_rows(df, payee_col, amount_col, work_col)
+    if not receipts:
+        return None, rejected, config.ERROR_MESSAGES['no_valid_data']
+
+    return receipts, rejected, ""
+
+def parse_all_sheets(file_stream):
+    """Parse every sheet with recognisable columns; receipts stay grouped by sheet"""
+    sheets, error_msg = excel_processor.read_excel_sheets(file_stream)
+    if not sheets:
+        return None, [], error_msg
+
+    # The workbook was loaded once and every sheet read from it; turning rows into
+    # receipts is cheap, so the sheets are simply processed in order
+    receipts, rejected = [], []
+    for _, df in sheets:
+        payee_col, amount_col, work_col, _ = excel_processor.find_columns(df)
+        sheet_receipts, sheet_rejected = excel_processor.process_rows(df, payee_col, amount_col, work_col)
+        receipts.extend(sheet_receipts)
+        rejected.extend(sheet_rejected)
+
+    if not receipts:
+        return None, rejected, config.ERROR_MESSAGES['no_valid_data']
+    return receipts, rejected, ""
+
+def with_rejected_rows(response, rejected):
+    """Report rows that could not be turned into receipts in response headers"""
+    response.headers['X-Rejected-Count'] = str(len(rejected))
+    if rejected:
+        response.headers['X-Rejected-Rows'] = json.dumps(rejected[:config.REJECTED_ROWS_REPORT_LIMIT])
+    return response
+
+def with_ledger_changes(response, changes):
+    """Report which receipts an incremental render re-rendered and which rows changed"""
+    if changes:
+        response.headers['X-Ledger-Changes'] = json.dumps(changes)
+    return response
+
+def ledger_key_for(requested):
+    """Key under which a ledger's receipts are remembered between uploads, or None.
+
+    Only an explicit ``ledger_key`` opts in; file names like "input.xlsx"
+    are too common to tell one clerk's ledger from another's.
+    """
+    if incremental_renderer is None:
+        return None
+    return (requested or "").strip() or None
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -165,60 +229,520 @@ def index():
             return error_msg, 400
 
         try:
-            # Read file into memory efficiently
-            file_stream = BytesIO(file.read())
-            
-            # Process Excel file
-            df, error_msg = excel_processor.read_excel(file_stream)
-            if df is None:
-                return error_msg, 400
-
-            # Find required columns
-            payee_col, amount_col, work_col, error_msg = excel_processor.find_columns(df)
-            if not all([payee_col, amount_col, work_col]):
-                return error_msg, 400
-
-            # Process data
-            receipts = excel_processor.process_data(df, payee_col, amount_col, work_col)
-            if not receipts:
-                return config.ERROR_MESSAGES['no_valid_data'], 400
-
-            # Render HTML template
-            rendered_html = receipt_template.render(receipts=receipts)
-
-            # Generate PDF with temporary file
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-                pdf_file = tmp_file.name
-
-            if not pdf_generator.generate_pdf(rendered_html, pdf_file):
-                return "Error generating PDF", 500
-
-            # Send file and clean up
-            try:
-                return send_file(
-                    pdf_file,
-                    as_attachment=True,
-                    download_name="receipts.pdf",
-                    mimetype='application/pdf'
-                )
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(pdf_file)
-                except OSError:
-                    pass
+            # The upload was spooled and hashed while it arrived; no extra copy needed
+            file_stream, digest, error_msg, status = ingested_upload(file)
+            if file_stream is None:
+                return error_msg, status
+
+            # The browser sends the hash it computed as an idempotency key
+            idempotency_key = (request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or '').lower()
+            if idempotency_key and idempotency_key != digest:
+                return config.ERROR_MESSAGES['idempotency_mismatch'], 400
+
+            output = request.form.get("output")
+            all_sheets = output == "sheets" or is_enabled(request.form.get("all_sheets"))
+
+            if output in ("zip", "sheets", "html"):
+                receipts, rejected, error_msg = parse_workbook(file_stream, all_sheets=all_sheets)
+                if receipts is None:
+                    return with_rejected_rows(app.make_response((error_msg, 400)), rejected)
+                if output == "html":
+                    return with_rejected_rows(send_receipts_html(receipts, is_enabled(request.form.get("autoprint"))), rejected)
+                if output == "sheets":
+                    return with_rejected_rows(send_sheets_zip(receipts), rejected)
+                return with_rejected_rows(send_receipts_zip(receipts), rejected)
+
+            # Identical uploads are served from the output store without re-rendering
+            ledger_key = ledger_key_for(request.form.get("ledger_key"))
+            output_id, error_msg, status_code, rejected, changes = render_stored_pdf(
+                file_stream, digest, all_sheets=all_sheets, ledger_key=ledger_key
+            )
+            if output_id is None:
+                return with_rejected_rows(app.make_response((error_msg, status_code)), rejected)
+            return with_ledger_changes(with_rejected_rows(send_output(output_id), rejected), changes)
 
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}")
             return config.ERROR_MESSAGES['processing_error'].format(error=str(e)), 500
 
-    return render_template("index.html")
+    return render_template("index.html", chunked_upload_threshold=config.CHUNKED_UPLOAD_THRESHOLD)
+
+def is_enabled(value):
+    """Interpret a checkbox or query-string flag"""
+    return (value or "").lower() in ('1', 'true', 'on', 'yes')
+
+def pdf_output_key(digest, all_sheets=False):
+    """Output store key for the merged PDF of a workbook; all-sheet renders are stored separately"""
+    return OutputStore.make_key('pdf-all-sheets' if all_sheets else 'pdf', digest)
+
+def render_stored_pdf(file_stream, digest, all_sheets=False, ledger_key=None):
+    """Parse a workbook and render it into the output store under its content hash.
+
+    Returns (output_id, error, status, rejected rows, ledger changes).
+    Concurrent requests for the same workbook render once; the rest get the
+    stored result, including the rows that were rejected when it was parsed.
+    With a ``ledger_key`` a workbook that is not in the store yet is diffed
+    against the ledger's last upload and only new or changed receipts are
+    rendered.
+    """
+    output_key = pdf_output_key(digest, all_sheets)
+    with output_store.hold(output_key):
+        cached = output_store.lookup_info(output_key)
+        if cached:
+            return cached["output_id"], "", 200, cached.get("rejected", []), None
+
+        receipts, rejected, error_msg = parse_workbook(file_stream, all_sheets=all_sheets)
+        if receipts is None:
+            return None, error_msg, 400, rejected, None
+
+        changes = None
+        if ledger_key:
+            pdf_file, changes = incremental_renderer.render(ledger_key, receipts)
+        else:
+            pdf_file = generate_receipts_pdf(receipts)
+        if pdf_file is None:
+            return None, config.ERROR_MESSAGES['pdf_error'], 500, rejected, None
+
+        try:
+            output_id = output_store.put_file(
+                pdf_file, "receipts.pdf", 'application/pdf', key=output_key, key_info={"rejected": rejected}
+            )
+            return output_id, "", 200, rejected, changes
+        finally:
+            try:
+                os.unlink(pdf_file)
+            except OSError:
+                pass
+
+@app.route("/api/uploads", methods=["POST"])
+def create_upload():
+    """Start a chunked, resumable upload"""
+    payload = request.get_json(silent=True) or {}
+    filename = str(payload.get("filename") or "")
+
+    is_valid, error_msg = excel_processor.validate_file(None, filename)
+    if not is_valid:
+        return jsonify({"error": error_msg}), 400
+
+    session, error_msg = upload_manager.create(filename, payload.get("size"), payload.get("chunk_size"))
+    if session is None:
+        return jsonify({"error": error_msg}), 400
+    return jsonify(session), 201
+
+@app.route("/api/uploads/<upload_id>", methods=["GET"])
+def upload_status(upload_id):
+    """Report how many bytes of an upload have arrived, so the client can resume"""
+    session = upload_manager.status(upload_id)
+    if session is None:
+        return jsonify({"error": config.ERROR_MESSAGES['upload_not_found']}), 404
+    return jsonify(session)
+
+@app.route("/api/uploads/<upload_id>", methods=["PUT"])
+def upload_chunk(upload_id):
+    """Receive one chunk; the final chunk triggers parsing and rendering"""
+    try:
+        offset = int(request.args.get("offset", ""))
+    except ValueError:
+        return jsonify({"error": config.ERROR_MESSAGES['chunk_out_of_order'].format(received='unknown')}), 400
+
+    session = upload_manager.status(upload_id)
+    if session is None:
+        return jsonify({"error": config.ERROR_MESSAGES['upload_not_found']}), 404
+
+    data = request.get_data(cache=False)
+    if offset > session["received"] or offset < session["received"] < offset + len(data):
+        # Tell the client where to continue from
+        return jsonify({
+            "error": config.ERROR_MESSAGES['chunk_out_of_order'].format(received=session["received"]),
+            "received": session["received"]
+        }), 409
+
+    session, error_msg = upload_manager.append(upload_id, offset, data)
+    if session is None:
+        return jsonify({"error": error_msg}), 400
+    if not session["complete"]:
+        return jsonify(session)
+
+    try:
+        digest, error_msg = upload_manager.finish(upload_id)
+        if digest is None:
+            return jsonify({"error": error_msg}), 409
+
+        expected = (request.args.get("sha256") or "").lower()
+        if expected and expected != digest:
+            upload_manager.discard(upload_id)
+            return jsonify({"error": config.ERROR_MESSAGES['checksum_mismatch']}), 400
+
+        # Parse straight from the assembled file; no extra in-memory copy
+        with open(upload_manager.part_path(upload_id), 'rb') as file_stream:
+            # Same signature and central-directory checks as a form upload
+            error_msg = verify_file(config, session["filename"], file_stream)
+            if error_msg:
+                upload_manager.discard(upload_id)
+                return jsonify({"error": error_msg}), 400
+            output_id, error_msg, status_code, rejected, changes = render_stored_pdf(
+                file_stream, digest, all_sheets=is_enabled(request.args.get("all_sheets")),
+                ledger_key=ledger_key_for(request.args.get("ledger_key"))
+            )
+        upload_manager.discard(upload_id)
+
+        if output_id is None:
+            return jsonify({"error": error_msg, "rejected": rejected}), status_code
+        return jsonify({
+            **session,
+            "sha256": digest,
+            "output_id": output_id,
+            "rejected": rejected,
+            "changes": changes,
+            "url": url_for('get_output', output_id=output_id, download=1)
+        })
+
+    except Exception as e:
+        logger.error(f"Error processing chunked upload: {str(e)}")
+        return jsonify({"error": config.ERROR_MESSAGES['processing_error'].format(error=str(e))}), 500
+
+@app.route("/api/preview", methods=["POST"])
+def preview():
+    """Render the first few receipts of an upload so the column mapping can be checked.
+
+    Returns the detected header row and columns, the first ``count``
+    receipts as JSON and a link to them as a lightweight HTML page (plus
+    PNG thumbnails with ``thumbnails=1``). Results are stored under the
+    upload's hash, so previewing the same file again costs nothing.
+    """
+    file = request.files["file"]
+
+    is_valid, error_msg = excel_processor.validate_file(file, file.filename)
+    if not is_valid:
+        return jsonify({"error": error_msg}), 400
+
+    try:
+        file_stream, digest, error_msg, status = ingested_upload(file)
+        if file_stream is None:
+            return jsonify({"error": error_msg}), status
+
+        count = request.values.get("count", config.PREVIEW_RECEIPTS, type=int)
+        count = max(1, min(count, config.PREVIEW_MAX_RECEIPTS))
+        thumbnails = is_enabled(request.values.get("thumbnails"))
+
+        summary, error_msg = render_preview(file_stream, digest, count, thumbnails)
+        if summary is None:
+            return jsonify({"error": error_msg}), 400
+        return jsonify({
+            **summary,
+            "html_url": url_for('get_output', output_id=summary["html_id"]),
+            "thumbnails": [url_for('get_output', output_id=output_id) for output_id in summary["thumbnail_ids"]]
+        })
+
+    except Exception as e:
+        logger.error(f"Error previewing file: {str(e)}")
+        return jsonify({"error": config.ERROR_MESSAGES['processing_error'].format(error=str(e))}), 500
+
+def render_preview(file_stream, digest, count, thumbnails=False):
+    """Parse a workbook and render its first ``count`` receipts, returning (summary, error)"""
+    preview_key = OutputStore.make_key(f"preview-{count}{'-png' if thumbnails else ''}", digest)
+    with output_store.hold(preview_key):
+        cached = output_store.lookup_info(preview_key)
+        if cached and all(output_store.get(output_id) for output_id in cached["thumbnail_ids"]):
+            summary = {key: value for key, value in cached.items() if key != "output_id"}
+            return {**summary, "html_id": cached["output_id"], "cached": True}, ""
+
+        df, error_msg = excel_processor.read_excel(file_stream)
+        if df is None:
+            return None, error_msg
+        payee_col, amount_col, work_col, error_msg = excel_processor.find_columns(df)
+        if not all([payee_col, amount_col, work_col]):
+            return None, error_msg
+
+        receipts, rejected = excel_processor.process_rows(df, payee_col, amount_col, work_col)
+        shown = receipts[:count]
+
+        thumbnail_ids = []
+        if thumbnails:
+            width = config.PREVIEW_THUMBNAIL_WIDTH
+            rendered = dict(map_as_completed(
+                lambda index: pdf_generator.generate_png_bytes(
+                    receipt_template.generate(receipts=[shown[index]]), width, round(width / 800, 2)
+                ),
+                range(len(shown)),
+                config.RENDER_WORKERS
+            ))
+            thumbnail_ids = [
+                output_store.put_bytes(rendered[index], f"receipt-{index + 1}.png", 'image/png')
+                for index in range(len(shown)) if rendered[index]
+            ]
+
+        summary = {
+            "sha256": digest,
+            "sheet": df.attrs.get("sheet"),
+            "header_row": df.attrs.get("header_row", 1),
+            "columns": {"payee": payee_col, "amount": amount_col, "work": work_col},
+            "receipts_found": len(receipts),
+            "rejected_count": len(rejected),
+            "rejected": rejected[:config.REJECTED_ROWS_REPORT_LIMIT],
+            "receipts": [receipt.to_dict() for receipt in shown],
+            "thumbnail_ids": thumbnail_ids
+        }
+        html = template_registry.format(config.HTML_RECEIPT_FORMAT).render(receipts=shown, print_ready=True)
+        # A preview missing thumbnails (e.g. no wkhtmltoimage) is not kept under the upload's hash
+        complete = len(thumbnail_ids) == (len(shown) if thumbnails else 0)
+        summary["html_id"] = output_store.put_bytes(
+            html.encode('utf-8'), "preview.html", 'text/html',
+            key=preview_key if complete else None, key_info=summary
+        )
+        return {**summary, "cached": False}, ""
+
+@app.route("/api/precheck/<digest>", methods=["GET"])
+def precheck(digest):
+    """Tell the browser whether a workbook with this SHA-256 already has a stored PDF"""
+    digest = digest.lower()
+    if not OutputStore.is_sha256(digest):
+        return jsonify({"error": config.ERROR_MESSAGES['invalid_hash']}), 400
+
+    all_sheets = is_enabled(request.args.get("all_sheets"))
+    output_id = output_store.lookup(pdf_output_key(digest, all_sheets))
+    if output_id is None:
+        return jsonify({"cached": False})
+    return jsonify({
+        "cached": True,
+        "output_id": output_id,
+        "url": url_for('get_output', output_id=output_id, download=1)
+    })
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Process several workbooks in one request into a merged PDF or a ZIP of PDFs"""
+    # Batches are allowed a larger body than single uploads
+    request.max_content_length = config.BATCH_MAX_CONTENT_LENGTH
+
+    uploads = [f for f in request.files.getlist("files") if f and f.filename]
+    if not uploads:
+        return config.ERROR_MESSAGES['no_file'], 400
+    if len(uploads) > config.BATCH_MAX_FILES:
+        return config.ERROR_MESSAGES['too_many_files'].format(max_files=config.BATCH_MAX_FILES), 400
+
+    try:
+        # Files failing the ingestion checks are reported without being parsed
+        files, rejected = [], {}
+        for position, upload in enumerate(uploads):
+            file_stream, _, error_msg, _ = ingested_upload(upload)
+            if file_stream is None:
+                rejected[position] = empty_result(upload.filename, error_msg)
+            else:
+                files.append((upload.filename, file_stream.read()))
+        parsed = iter(batch_processor.parse_files(files) if files else [])
+        results = [rejected[position] if position in rejected else next(parsed) for position in range(len(uploads))]
+        report = BatchProcessor.report(results)
+        # Each result travels with its report entry, so uploads with the same name stay apart
+        succeeded = [(entry, result) for entry, result in zip(report, results) if result["receipts"]]
+        if not succeeded:
+            return jsonify({"error": config.ERROR_MESSAGES['batch_failed'], "files": report}), 400
+
+        if request.form.get("output", "merged") == "zip":
+            # The PDFs are rendered while the ZIP streams, after the headers have gone out, so
+            # X-Batch-Report covers parsing only; batch_report.json at the end of the archive
+            # adds any render failures
+            response = send_batch_zip(succeeded, report)
+            response.headers['X-Batch-Report'] = json.dumps(report)
+            return response
+
+        receipts = [receipt for _, result in succeeded for receipt in result["receipts"]]
+        pdf_file = generate_receipts_pdf(receipts)
+        if pdf_file is None:
+            return jsonify({"error": config.ERROR_MESSAGES['pdf_error'], "files": report}), 500
+        response = send_pdf_file(pdf_file)
+        # Built after rendering, so the report is final
+        response.headers['X-Batch-Report'] = json.dumps(report)
+        return response
+
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}")
+        return config.ERROR_MESSAGES['processing_error'].format(error=str(e)), 500
+
+def send_batch_zip(results, report):
+    """Render one PDF per source workbook concurrently and stream them as a ZIP.
+
+    ``results`` pairs each parse result with its entry in ``report``; render
+    failures are recorded on that entry as they happen and written to the
+    archive's closing batch_report.json.
+    """
+    def entries():
+        used_names = set()
+        rendered = map_as_completed(
+            lambda pair: pdf_generator.generate_pdf_bytes(receipt_template.generate(receipts=pair[1]["receipts"])),
+            results,
+            config.RENDER_WORKERS
+        )
+        for (entry, result), pdf_bytes in rendered:
+            if pdf_bytes is None:
+                entry["error"] = config.ERROR_MESSAGES['pdf_error']
+                continue
+            stem = safe_file_name(os.path.splitext(os.path.basename(result["file"]))[0], default="receipts")
+            yield unique_name(stem, "pdf", used_names), pdf_bytes
+        yield "batch_report.json", json.dumps(report, indent=2).encode()
+
+    return send_zip_stream(entries(), "receipts.zip")
+
+def send_receipts_zip(receipts):
+    """Render each receipt to its own PDF in a worker pool and stream them as a ZIP"""
+    def entries():
+        used_names = set()
+        rendered = map_as_completed(
+            lambda receipt: pdf_generator.generate_pdf_bytes(receipt_template.generate(receipts=[receipt])),
+            receipts,
+            config.RENDER_WORKERS
+        )
+        for receipt, pdf_bytes in rendered:
+            if pdf_bytes is None:
+                logger.error(f"Skipping receipt for row {receipt.get('row')}: PDF generation failed")
+                continue
+            yield receipt_file_name(receipt, used_names), pdf_bytes
+
+    return send_zip_stream(entries(), "receipts.zip")
+
+def send_sheets_zip(receipts):
+    """Render one PDF per worksheet concurrently and stream them as a ZIP"""
+    sheets = {}
+    for receipt in receipts:
+        sheets.setdefault(receipt.get("sheet", "Sheet"), []).append(receipt)
+
+    def entries():
+        used_names = set()
+        rendered = map_as_completed(
+            lambda sheet: pdf_generator.generate_pdf_bytes(receipt_template.generate(receipts=sheets[sheet])),
+            list(sheets),
+            config.RENDER_WORKERS
+        )
+        for sheet, pdf_bytes in rendered:
+            if pdf_bytes is None:
+                logger.error(f"Skipping sheet {sheet}: PDF generation failed")
+                continue
+            yield unique_name(safe_file_name(sheet, default="sheet"), "pdf", used_names), pdf_bytes
+
+    return send_zip_stream(entries(), "receipts.zip")
+
+def send_receipts_html(receipts, autoprint=False):
+    """Stream the receipts as print-ready HTML, skipping PDF conversion.
+
+    The page is self-contained (inline CSS, no external resources) and is
+    gzipped on the fly when the browser accepts it. With ``autoprint`` the
+    print dialog opens once the page has loaded.
+    """
+    html_template = template_registry.format(config.HTML_RECEIPT_FORMAT)
+    body = encode_chunks(
+        html_template.generate(receipts=receipts, print_ready=True, autoprint=autoprint),
+        config.CHUNK_SIZE * 8
+    )
+    headers = {'Content-Disposition': 'inline; filename="receipts.html"', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        body = stream_gzip(body, config.HTML_COMPRESS_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+
+    response = Response(stream_with_context(body), mimetype='text/html', headers=headers)
+    # Receipts carry payee details
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
+def send_zip_stream(entries, download_name):
+    """Stream ZIP entries to the client as they are produced"""
+    return Response(
+        stream_with_context(stream_zip(entries)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
+
+@app.route("/api/receipts", methods=["POST"])
+def api_receipts():
+    """Generate receipts from JSON/NDJSON rows without going through Excel"""
+    records, error_msg = read_api_records(config.API_MAX_ROWS)
+    if records is None:
+        return jsonify({"error": error_msg}), 400
+
+    try:
+        receipts, row_errors = excel_processor.process_records(records)
+        summary = {
+            "rows": len(records),
+            "valid": len(receipts),
+            "invalid": len(row_errors),
+            "errors": row_errors
+        }
+
+        # Reject the whole batch on any bad row unless partial output is requested
+        partial = is_enabled(request.args.get('partial'))
+        if row_errors and not partial:
+            return jsonify({"error": config.ERROR_MESSAGES['invalid_rows'], **summary}), 422
+
+        if is_enabled(request.args.get('validate_only')):
+            return jsonify(summary)
+
+        if not receipts:
+            return jsonify({"error": config.ERROR_MESSAGES['no_valid_data'], **summary}), 422
+
+        pdf_file = generate_receipts_pdf(receipts)
+        if pdf_file is None:
+            return jsonify({"error": config.ERROR_MESSAGES['pdf_error']}), 500
+
+        response = send_pdf_file(pdf_file)
+        response.headers['X-Receipt-Count'] = str(len(receipts))
+        response.headers['X-Invalid-Rows'] = str(len(row_errors))
+        return response
+
+    except Exception as e:
+        logger.error(f"Error processing API rows: {str(e)}")
+        return jsonify({"error": config.ERROR_MESSAGES['processing_error'].format(error=str(e))}), 500
+
+@app.route("/outputs/<output_id>", methods=["GET"])
+def get_output(output_id):
+    """Fetch a previously generated output by ID (supports ETag and Range requests)"""
+    as_attachment = is_enabled(request.args.get('download'))
+    return send_output(output_id, as_attachment=as_attachment)
+
+def warmup_receipt():
+    """Synthetic receipt rendered during warm-up"""
+    receipt, _ = excel_processor.build_receipt("Warm-up Contractor", 12345.5, "Warm-up work")
+    return receipt
+
+def warm_up_parsing():
+    """Read a small in-memory workbook through the configured engine"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(["Payee Name", "Amount", "Work"])
+    workbook.active.append(["Warm-up Contractor", 12345.5, "Warm-up work"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    df, error_msg = excel_processor.read_excel(buffer)
+    if df is None:
+        raise ValueError(error_msg)
+    excel_processor.process_rows(df, *excel_processor.find_columns(df)[:3])
+
+def warm_up_pdf():
+    """Start wkhtmltopdf once so fonts and the rendering engine are loaded"""
+    if pdf_generator.generate_pdf_bytes(receipt_template.generate(receipts=[warmup_receipt()])) is None:
+        raise RuntimeError(config.ERROR_MESSAGES['pdf_error'])
+
+# Prime renderers and caches in the background; /ready reports when this is done
+warmup = WarmUp(config)
+warmup.add_step("templates", template_registry.warm)
+warmup.add_step("amount words", lambda: [convert_to_words(amount) for amount in config.WARMUP_AMOUNTS])
+warmup.add_step("workbook parsing", warm_up_parsing)
+warmup.add_step("html", lambda: [template_registry.render([warmup_receipt()], name) for name in template_registry.names()])
+warmup.add_step("wkhtmltopdf", warm_up_pdf)
+warmup.start()
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     return "OK"
 
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness endpoint: 200 once warm-up has finished, 503 while warming or if a step failed"""
+    status = warmup.status()
+    return jsonify(status), 200 if warmup.ready else 503
+
 @app.route("/status", methods=["GET"])
 def status():
     """Application status endpoint"""
@@ -226,7 +750,8 @@ def status():
         "status": "healthy",
         "version": "1.0.0",
         "max_rows": config.MAX_ROWS,
-        "max_file_size": config.MAX_CONTENT_LENGTH
+        "max_file_size": config.MAX_CONTENT_LENGTH,
+        "warmup": warmup.status()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Dict, Optional, Tuple
+import threading
+
+from config import Config, get_config
+from utils import ExcelProcessor
+
+logger = logging.getLogger(__name__)
+
+# Workbook parsing is pure Python (openpyxl), so it runs in worker processes
+# to get real parallelism. The pool is shared and created on first use.
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Get the shared process pool used for workbook parsing"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+        return _executor
+
+def empty_result(filename: str, error: str = "") -> Dict:
+    """A parse result with no receipts; every result has these keys"""
+    return {"file": filename, "receipts": [], "rejected": [], "error": error, "truncated": False}
+
+def parse_workbook(config_name: Optional[str], filename: str, data: bytes, max_rows: Optional[int] = None) -> Dict:
+    """Parse a single workbook into receipts (runs inside a worker process).
+
+    ``max_rows`` overrides MAX_ROWS (0 reads every row); ``truncated`` in the
+    result tells whether rows past the limit were left unread.
+    """
+    config = get_config(config_name)
+    processor = ExcelProcessor(config, max_rows)
+    result = empty_result(filename)
+
+    is_valid, error_msg = processor.validate_file(None, filename)
+    if not is_valid:
+        result["error"] = error_msg
+        return result
+
+    df, error_msg = processor.read_excel(BytesIO(data))
+    if df is None:
+        result["error"] = error_msg
+        return result
+
+    result["truncated"] = df.attrs.get("truncated", False)
+
+    payee_col, amount_col, work_col, error_msg = processor.find_columns(df)
+    if not all([payee_col, amount_col, work_col]):
+        result["error"] = error_msg
+        return result
+
+    receipts, result["rejected"] = processor.process_rows(df, payee_col, amount_col, work_col)
+    if not receipts:
+        result["error"] = config.ERROR_MESSAGES['no_valid_data']
+        return result
+
+    result["receipts"] = receipts
+    return result
+
+class BatchProcessor:
+    """Parses several uploaded workbooks concurrently"""
+
+    def __init__(self, config: Config, config_name: Optional[str] = None):
+        self.config = config
+        self.config_name = config_name or os.environ.get('FLASK_ENV')
+        self.max_workers = config.BATCH_WORKERS
+
+    def parse_files(self, files: List[Tuple[str, bytes]]) -> List[Dict]:
+        """Parse (filename, data) pairs, returning one result per file in upload order"""
+        if len(files) == 1:
+            # Not worth a round trip through the pool
+            filename, data = files[0]
+            return [self._parse_safely(filename, data)]
+
+        executor = _get_executor(self.max_workers)
+        futures = [
+            executor.submit(parse_workbook, self.config_name, filename, data)
+            for filename, data in files
+        ]
+
+        results = []
+        for (filename, _), future in zip(files, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error parsing {filename}: {str(e)}")
+                results.append(empty_result(
+                    filename, self.config.ERROR_MESSAGES['processing_error'].format(error=str(e))
+                ))
+        return results
+
+    def _parse_safely(self, filename: str, data: bytes) -> Dict:
+        """Parse a workbook in-process, converting unexpected errors into a result"""
+        try:
+            return parse_workbook(self.config_name, filename, data)
+        except Exception as e:
+            logger.error(f"Error parsing {filename}: {str(e)}")
+            return empty_result(filename, self.config.ERROR_MESSAGES['processing_error'].format(error=str(e)))
+
+    @staticmethod
+    def report(results: List[Dict]) -> List[Dict]:
+        """Summarise per-file outcomes without the receipt payloads"""
+        return [
+            {
+                "file": result["file"],
+                "receipts": len(result["receipts"]),
+                "rejected": result["rejected"],
+                "error": result["error"]
+            }
+            for result in results
+        ]
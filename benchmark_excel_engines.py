@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Excel Engine Benchmark
+Compares the openpyxl and ooxml read engines on test_input_files/ and on
+large synthetic ledgers, checking that both return the same data.
+
+Usage: python benchmark_excel_engines.py [--repeat N] [--rows 1000 20000 ...]
+"""
+
+import argparse
+import glob
+import io
+import os
+import statistics
+import time
+
+from openpyxl import Workbook
+
+from config import get_config
+from utils import ExcelProcessor
+
+ENGINES = ('openpyxl', 'ooxml')
+
+def synthetic_workbook(rows: int, extra_columns: int = 12) -> bytes:
+    """A wide ledger: title rows above the header and filler columns around the three we read.
+
+    Saved like Excel saves it, with shared strings and a sheet dimension.
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Ledger'
+    sheet.append(['Division ledger'])
+    sheet.append([])
+    fillers = [f'Note {i}' for i in range(extra_columns)]
+    sheet.append(['S.No', 'Date', 'Payee Name'] + fillers[:extra_columns // 2] + ['Amount', 'Work'] + fillers[extra_columns // 2:])
+    for i in range(rows):
+        filler = [f'remark {i % 97}-{j}' for j in range(extra_columns)]
+        sheet.append([i + 1, f'2024-04-{i % 28 + 1:02d}', f'Contractor {i % 500}']
+                     + filler[:extra_columns // 2] + [1000 + (i * 37) % 90000 + 0.5, f'Work order {i}']
+                     + filler[extra_columns // 2:])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def processor_for(engine: str, max_rows: int) -> ExcelProcessor:
+    base = get_config()
+
+    class BenchmarkConfig(base):
+        EXCEL_ENGINE = engine
+        MAX_ROWS = max_rows
+        MAX_SHEET_ROWS = max(base.MAX_SHEET_ROWS, max_rows + 10)
+
+    return ExcelProcessor(BenchmarkConfig)
+
+def time_read(processor: ExcelProcessor, data: bytes, repeat: int):
+    """Median seconds for read_excel, plus the dataframe it returned"""
+    timings = []
+    df = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df, error = processor.read_excel(io.BytesIO(data))
+        timings.append(time.perf_counter() - start)
+        if df is None:
+            raise RuntimeError(error)
+    return statistics.median(timings), df
+
+def benchmark(name: str, data: bytes, max_rows: int, repeat: int):
+    results = {}
+    frames = {}
+    for engine in ENGINES:
+        results[engine], frames[engine] = time_read(processor_for(engine, max_rows), data, repeat)
+
+    same = frames['openpyxl'].equals(frames['ooxml']) and list(frames['openpyxl'].columns) == list(frames['ooxml'].columns)
+    speedup = results['openpyxl'] / results['ooxml'] if results['ooxml'] else float('inf')
+    print(f"{name:<34} {len(frames['ooxml']):>7} {results['openpyxl'] * 1000:>11.1f} "
+          f"{results['ooxml'] * 1000:>11.1f} {speedup:>8.1f}x  {'yes' if same else 'NO'}")
+    return same
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel read engines")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (median is reported)")
+    parser.add_argument('--rows', type=int, nargs='*', default=[1000, 20000, 90000], help="synthetic ledger sizes")
+    args = parser.parse_args()
+
+    print(f"{'Workbook':<34} {'Rows':>7} {'openpyxl ms':>11} {'ooxml ms':>11} {'Speedup':>9}  Same")
+    print("-" * 84)
+
+    all_same = True
+    default_rows = get_config().MAX_ROWS
+    for path in sorted(glob.glob(os.path.join('test_input_files', '*.xlsx'))):
+        with open(path, 'rb') as f:
+            all_same &= benchmark(os.path.basename(path), f.read(), default_rows, args.repeat)
+
+    for rows in args.rows:
+        data = synthetic_workbook(rows)
+        label = f"synthetic {rows} rows ({len(data) // 1024} KB)"
+        # First MAX_ROWS rows (what the app reads) and the whole sheet
+        all_same &= benchmark(f"{label}", data, default_rows, args.repeat)
+        all_same &= benchmark(f"  all rows", data, rows, max(1, args.repeat // 2))
+
+    print("-" * 84)
+    print("✅ Engines agree on every workbook" if all_same else "❌ Engines returned different data")
+
+if __name__ == "__main__":
+    main()
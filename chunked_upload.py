@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ChunkedUploadManager:
+    """Assembles workbooks uploaded in fixed-size chunks into files on disk.
+
+    Chunks must arrive in order; the byte count on disk is the source of truth
+    for how far an upload has got, so an interrupted client can ask for the
+    current offset and resume from there (also after a server restart). The
+    SHA-256 of the assembled file is computed incrementally as chunks land.
+    """
+
+    def __init__(self, config: Config, directory: Optional[str] = None):
+        self.config = config
+        self.directory = directory or os.path.join(config.TEMP_DIR, 'receipt_uploads')
+        self.max_size = config.MAX_CONTENT_LENGTH
+        # upload_id -> (running hash, number of bytes hashed so far)
+        self._hashes = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def create(self, filename: str, size: int, chunk_size: Optional[int] = None) -> Tuple[Optional[Dict], str]:
+        """Start a new upload session"""
+        if not isinstance(size, int) or size <= 0:
+            return None, self.config.ERROR_MESSAGES['empty_file']
+        if size > self.max_size:
+            return None, self.config.ERROR_MESSAGES['file_too_large']
+
+        self._expire_sessions()
+
+        # Clients may ask for bigger chunks than the default, within limits
+        chunk_size = chunk_size if isinstance(chunk_size, int) else self.config.CHUNK_SIZE
+        chunk_size = max(self.config.CHUNK_SIZE, min(chunk_size, self.config.UPLOAD_MAX_CHUNK_SIZE))
+
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "created": time.time()
+        }
+        open(self._part_path(upload_id), 'wb').close()
+        self._write_meta(upload_id, session)
+        return self._with_progress(session), ""
+
+    def status(self, upload_id: str) -> Optional[Dict]:
+        """Return the session with the number of bytes received so far"""
+        session = self._read_meta(upload_id)
+        if session is None or not os.path.exists(self._part_path(upload_id)):
+            return None
+        return self._with_progress(session)
+
+    def append(self, upload_id: str, offset: int, data: bytes) -> Tuple[Optional[Dict], str]:
+        """Append one chunk at the given offset"""
+        session = self.status(upload_id)
+        if session is None:
+            return None, self.config.ERROR_MESSAGES['upload_not_found']
+        if len(data) > session["chunk_size"]:
+            return None, self.config.ERROR_MESSAGES['chunk_too_large'].format(chunk_size=session["chunk_size"])
+
+        try:
+            with self._upload_lock(upload_id):
+                received = os.path.getsize(self._part_path(upload_id))
+
+                if offset + len(data) <= received:
+                    # Retry of a chunk we already have (e.g. the response was lost)
+                    return self._with_progress(session), ""
+                if offset != received:
+                    return None, self.config.ERROR_MESSAGES['chunk_out_of_order'].format(received=received)
+                if received + len(data) > session["size"]:
+                    return None, self.config.ERROR_MESSAGES['file_too_large']
+
+                with open(self._part_path(upload_id), 'ab') as f:
+                    f.write(data)
+                self._update_hash(upload_id, received, data)
+        except TimeoutError:
+            return None, self.config.ERROR_MESSAGES['upload_busy']
+
+        return self._with_progress(session), ""
+
+    def finish(self, upload_id: str) -> Tuple[Optional[str], str]:
+        """Return the SHA-256 of a fully received upload"""
+        session = self.status(upload_id)
+        if session is None:
+            return None, self.config.ERROR_MESSAGES['upload_not_found']
+        if session["received"] != session["size"]:
+            return None, self.config.ERROR_MESSAGES['upload_incomplete']
+
+        try:
+            with self._upload_lock(upload_id):
+                digest, hashed = self._hashes.get(upload_id, (hashlib.sha256(), 0))
+                self._catch_up_hash(upload_id, digest, hashed, session["size"])
+                return digest.hexdigest(), ""
+        except TimeoutError:
+            return None, self.config.ERROR_MESSAGES['upload_busy']
+
+    def part_path(self, upload_id: str) -> str:
+        """Path of the assembled file, for parsing in place"""
+        return self._part_path(upload_id)
+
+    def discard(self, upload_id: str):
+        """Remove an upload session and its data"""
+        try:
+            with self._upload_lock(upload_id):
+                self._hashes.pop(upload_id, None)
+                for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        except TimeoutError:
+            logger.warning(f"Upload {upload_id} is still being written; not discarded")
+
+    def _update_hash(self, upload_id: str, offset: int, data: bytes):
+        """Extend the running hash with a freshly written chunk"""
+        digest, hashed = self._hashes.get(upload_id, (hashlib.sha256(), 0))
+        # Another worker may have received earlier chunks; the file is
+        # append-only, so hash just the bytes this process has not seen yet
+        self._catch_up_hash(upload_id, digest, hashed, offset)
+        digest.update(data)
+        self._hashes[upload_id] = (digest, offset + len(data))
+
+    def _catch_up_hash(self, upload_id: str, digest, hashed: int, target: int):
+        if hashed >= target:
+            return
+        with open(self._part_path(upload_id), 'rb') as f:
+            f.seek(hashed)
+            remaining = target - hashed
+            while remaining > 0:
+                chunk = f.read(min(self.config.CHUNK_SIZE * 8, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        self._hashes[upload_id] = (digest, target)
+
+    @contextmanager
+    def _upload_lock(self, upload_id: str):
+        """Serialise work on one upload across threads and worker processes.
+
+        Chunks of one upload may reach different workers, so the lock is an
+        exclusively created file beside the upload, as in ``OutputStore.hold``.
+        The holder refreshes the file's mtime while it works, so only a lock
+        left behind by a dead worker goes stale (unrefreshed for
+        ``UPLOAD_LOCK_TIMEOUT``) and is removed. Raises TimeoutError when a
+        live holder keeps the lock past the timeout.
+        """
+        timeout = self.config.UPLOAD_LOCK_TIMEOUT
+        lock_path = self._lock_path(upload_id)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > timeout:
+                        logger.warning(f"Removing abandoned upload lock for {upload_id}")
+                        os.unlink(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Upload {upload_id} is locked")
+                time.sleep(0.05)
+
+        released = threading.Event()
+
+        def heartbeat():
+            while not released.wait(timeout / 4):
+                try:
+                    os.utime(lock_path)
+                except OSError:
+                    pass
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            yield
+        finally:
+            released.set()
+            try:
+                os.unlink(lock_path)
+            except OSError:
+                pass
+
+    def _expire_sessions(self):
+        """Drop sessions that were abandoned more than UPLOAD_SESSION_TTL ago"""
+        cutoff = time.time() - self.config.UPLOAD_SESSION_TTL
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-5]
+            try:
+                if os.path.getmtime(self._part_path(upload_id)) < cutoff:
+                    logger.info(f"Expiring abandoned upload {upload_id}")
+                    self.discard(upload_id)
+            except OSError:
+                self.discard(upload_id)
+
+    def _with_progress(self, session: Dict) -> Dict:
+        received = os.path.getsize(self._part_path(session["upload_id"]))
+        return {**session, "received": received, "complete": received == session["size"]}
+
+    @staticmethod
+    def _is_valid_id(upload_id: str) -> bool:
+        return len(upload_id) == 32 and all(c in '0123456789abcdef' for c in upload_id)
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _lock_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.lock")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def _read_meta(self, upload_id: str) -> Optional[Dict]:
+        if not self._is_valid_id(upload_id):
+            return None
+        try:
+            with open(self._meta_path(upload_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, upload_id: str, session: Dict):
+        with open(self._meta_path(upload_id), 'w', encoding='utf-8') as f:
+            json.dump(session, f)
@@ -21,17 +21,97 @@ class Config:
         "margin-left": "10mm"
     }
     
+    # Receipt templates (templates/receipts/); each format names a document template, an optional
+    # per-receipt fragment template (rendered once per distinct receipt and cached) and context defaults
+    TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+    RECEIPT_FORMATS = {
+        'rpwa28': {  # wkhtmltopdf layout
+            'template': 'receipts/rpwa28.html',
+            'fragment': 'receipts/rpwa28_receipt.html'
+        },
+        'rpwa28-print': {  # WeasyPrint layout
+            'template': 'receipts/rpwa28_print.html',
+            'fragment': 'receipts/rpwa28_print_receipt.html'
+        }
+    }
+    DEFAULT_RECEIPT_FORMAT = 'rpwa28'
+    HTML_RECEIPT_FORMAT = 'rpwa28-print'  # Layout served by the print-ready HTML output
+    HTML_COMPRESS_LEVEL = 6  # gzip level for streamed HTML output
+    RECEIPT_DIVISION = os.environ.get('RECEIPT_DIVISION', 'PWD Electric Division, Udaipur')
+    TEMPLATE_AUTO_RELOAD = True  # Recompile a template when its file changes
+    RECEIPT_FRAGMENT_CACHE_SIZE = 5000  # Rendered receipt fragments kept (about 3KB each)
+    WEASYPRINT_BATCH_SIZE = 25  # Receipts laid out per WeasyPrint pass; each pass is its own PDF, merged with pypdf
+    
     # Excel processing settings
     MAX_ROWS = 50
+    HEADER_SCAN_ROWS = 10  # Rows searched for the header when it is not on row 1
+    HEADER_REPORT_LIMIT = 20  # Header names listed when the required columns are missing
+    EXCEL_ENGINE = os.environ.get('EXCEL_ENGINE', 'ooxml')  # 'ooxml' (streaming reader) or 'openpyxl'
+    CSV_FALLBACK_ENCODING = 'cp1252'  # Used when a CSV/TSV file is neither UTF-8 nor has a BOM
+    CSV_SNIFF_BYTES = 64 * 1024  # Bytes read to detect encoding and delimiter
     SUPPORTED_COLUMNS = {
         'payee': ['Payee Name', 'PayeeName', 'Name', 'Contractor', 'Payee'],
         'amount': ['Amount', 'Value', 'Cost', 'Payment', 'Total'],
         'work': ['Work', 'Description', 'Item', 'Project', 'Job']
     }
     
+    # Workbook safety limits, checked before a workbook is parsed
+    MAX_ZIP_ENTRIES = 1000
+    MAX_UNCOMPRESSED_SIZE = 100 * 1024 * 1024
+    MAX_COMPRESSION_RATIO = 100
+    COMPRESSION_RATIO_MIN_SIZE = 1024 * 1024  # Ratio is only checked for parts bigger than this
+    MAX_SHEET_ROWS = 100000
+    MAX_SHEET_COLUMNS = 1000
+    MAX_SHARED_STRINGS = 500000
+    INSPECT_READ_LIMIT = 64 * 1024  # Bytes of a part decompressed while looking for its header
+    
+    # JSON receipts API settings
+    API_MAX_ROWS = 1000
+    REJECTED_ROWS_REPORT_LIMIT = 100  # Rejected rows listed in the X-Rejected-Rows header
+    CHANGED_ROWS_REPORT_LIMIT = 100  # Changed rows listed in the X-Ledger-Changes header
+    
+    # Preview settings (first receipts rendered so the column mapping can be checked)
+    PREVIEW_RECEIPTS = 3
+    PREVIEW_MAX_RECEIPTS = 10
+    PREVIEW_THUMBNAIL_WIDTH = 400  # Pixels; receipts are laid out 800px wide and zoomed to fit
+    
+    # Start-up warm-up (templates, amount words, workbook parsing, PDF backend); /ready waits for it
+    WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '1') != '0'
+    WARMUP_AMOUNTS = (1, 99, 1500.5, 12345.67, 1234567)  # Sample amounts converted to words
+    
+    # Batch upload settings
+    BATCH_MAX_FILES = 25
+    BATCH_MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB across all files in a batch
+    BATCH_WORKERS = min(4, os.cpu_count() or 1)
+    RENDER_WORKERS = 4
+    
+    # Generated output storage (content-addressed, shared by all workers)
+    OUTPUT_STORE_MAX_BYTES = 500 * 1024 * 1024
+    OUTPUT_MAX_AGE = 24 * 60 * 60  # Outputs never change once stored
+    RENDER_LOCK_TIMEOUT = 120  # Seconds a duplicate request waits for the first render
+    RESULT_STORE_MAX_BYTES = 64 * 1024 * 1024  # In-memory results shared by all Streamlit sessions
+    RESULT_STORE_SPILL = True  # Results evicted from memory move to the output store instead of being dropped
+    
+    # Render service settings (out-of-process WeasyPrint rendering for the Streamlit app)
+    RENDER_SERVICE_HOST = '127.0.0.1'  # Local only; the service has no authentication
+    RENDER_SERVICE_PORT = int(os.environ.get('RENDER_SERVICE_PORT', 8765))
+    RENDER_SERVICE_WORKERS = min(4, os.cpu_count() or 1)
+    RENDER_SERVICE_MAX_RECEIPTS = 5000
+    RENDER_SERVICE_JOB_TTL = 60 * 60  # Unfetched results are removed after an hour
+    RENDER_SERVICE_TIMEOUT = 300  # Seconds a client waits for a job to finish
+    RENDER_SERVICE_REQUEST_TIMEOUT = 30  # Seconds for a single request to the service
+    
+    # Chunked upload settings (chunks default to CHUNK_SIZE)
+    UPLOAD_MAX_CHUNK_SIZE = 1024 * 1024
+    UPLOAD_SESSION_TTL = 24 * 60 * 60  # Abandoned uploads are removed after a day
+    CHUNKED_UPLOAD_THRESHOLD = 1024 * 1024  # Browser switches to chunked uploads above this size
+    UPLOAD_LOCK_TIMEOUT = 30  # Seconds a chunk waits for another worker; an unrefreshed lock this old is abandoned
+    
     # File handling
-    ALLOWED_EXTENSIONS = {'.xlsx'}
+    ALLOWED_EXTENSIONS = {'.xlsx', '.ods', '.csv', '.tsv'}
     TEMP_DIR = os.environ.get('TEMP_DIR') or tempfile.gettempdir()
+    UPLOAD_SPOOL_MAX_MEMORY = 1024 * 1024  # Uploads larger than this spool to disk
+    SIGNATURE_PROBE_SIZE = 4096  # Bytes inspected before the rest of an upload is accepted
     
     # Performance settings
     CACHE_SIZE = 128
@@ -40,12 +120,34 @@ class Config:
     # Error messages
     ERROR_MESSAGES = {
         'no_file': 'No file selected',
-        'invalid_extension': 'Please upload an Excel (.xlsx) file',
+        'invalid_extension': 'Please upload an Excel (.xlsx), OpenDocument (.ods) or CSV/TSV file',
         'file_too_large': 'File size too large. Please select a file smaller than 10MB',
         'empty_file': 'Excel file is empty or contains no data',
+        'invalid_format': 'File is not a valid spreadsheet or CSV/TSV file',
+        'workbook_too_large': 'Workbook exceeds safety limits: {value} {what} (maximum {limit})',
         'missing_columns': 'Required columns not found. Found: {columns}. Need: Payee Name, Amount, Work',
         'no_valid_data': 'No valid data found in the Excel file. Please check the column names and data format.',
-        'processing_error': 'An error occurred while processing the file: {error}'
+        'processing_error': 'An error occurred while processing the file: {error}',
+        'invalid_json': 'Request body must be a JSON array of rows or NDJSON: {error}',
+        'too_many_rows': 'Too many rows. A maximum of {max_rows} rows is accepted per request',
+        'rows_truncated': 'Sheet has more than {max_rows} data rows; the rest would be left out',
+        'invalid_rows': 'Some rows failed validation',
+        'pdf_error': 'Error generating PDF',
+        'unknown_format': 'Unknown receipt format: {name}. Available: {formats}',
+        'too_many_files': 'Too many files. A maximum of {max_files} files is accepted per batch',
+        'batch_failed': 'None of the uploaded files could be processed',
+        'output_not_found': 'Requested output does not exist or has expired',
+        'invalid_hash': 'Expected a hex-encoded SHA-256 hash',
+        'idempotency_mismatch': 'Idempotency key does not match the uploaded file',
+        'upload_not_found': 'Upload session does not exist or has expired',
+        'upload_incomplete': 'Upload is not complete yet',
+        'chunk_too_large': 'Chunk is larger than the agreed chunk size of {chunk_size} bytes',
+        'chunk_out_of_order': 'Chunk does not continue the upload; {received} bytes have been received',
+        'upload_busy': 'Another request is still writing this upload; please retry',
+        'checksum_mismatch': 'Uploaded file does not match the expected SHA-256',
+        'invalid_render_job': 'Render job needs a non-empty list of receipts and an output of pdf or zip',
+        'render_job_not_found': 'Render job does not exist, has not finished or has expired',
+        'render_timeout': 'Render service did not finish the job in time'
     }
 
 class DevelopmentConfig(Config):
@@ -64,12 +166,14 @@ class ProductionConfig(Config):
         "no-debug-javascript": None,
         "no-stop-slow-scripts": None
     }
+    TEMPLATE_AUTO_RELOAD = False  # Templates only change on deploy
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
     MAX_ROWS = 10  # Smaller limit for testing
+    WARMUP_ON_START = False
 
 # Configuration mapping
 config = {
@@ -0,0 +1,98 @@
+import codecs
+import csv
+from typing import Iterator, Optional, Tuple
+
+# Delimiters tried when sniffing; accounting exports use all of these
+DELIMITERS = ',\t;|'
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+def sniff_encoding(sample: bytes, fallback: str) -> str:
+    """Pick an encoding from a byte order mark, else UTF-8 if the sample decodes, else ``fallback``"""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # The sample may end inside a multi-byte character, so decode incrementally
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return fallback
+
+def sniff_dialect(text: str):
+    """Detect the delimiter and quoting from the first complete lines of the file"""
+    lines = text.splitlines()
+    if len(lines) > 1:
+        # Drop the last line; the sample probably cut it short
+        lines = lines[:-1]
+    sample = '\n'.join(lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        first_line = lines[0] if lines else ''
+        dialect = csv.excel_tab if first_line.count('\t') > first_line.count(',') else csv.excel
+        return dialect
+
+class DelimitedWorkbook:
+    """CSV/TSV file presented as a one-sheet workbook.
+
+    The encoding and dialect are sniffed from the first few KB, then rows
+    are decoded and split lazily on each ``iter_rows`` call, which stops at
+    ``max_row``; a large export is never loaded whole. Values are strings
+    (blank cells are None), as typed in the file. The interface matches the
+    read-only workbooks ExcelProcessor reads (``worksheets``, ``title``,
+    ``iter_rows(..., values_only=True)``, ``close``).
+    """
+
+    def __init__(self, file_stream, fallback_encoding: str = 'cp1252', sniff_bytes: int = 64 * 1024,
+                 title: str = 'Sheet1'):
+        self._stream = file_stream
+        file_stream.seek(0)
+        sample = file_stream.read(sniff_bytes)
+        self.encoding = sniff_encoding(sample, fallback_encoding)
+        self.dialect = sniff_dialect(sample.decode(self.encoding, errors='ignore'))
+        self.worksheets = [DelimitedSheet(self, title)]
+
+    def close(self):
+        # The caller owns the stream
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def lines(self) -> Iterator[str]:
+        self._stream.seek(0)
+        return codecs.getreader(self.encoding)(self._stream, errors='replace')
+
+class DelimitedSheet:
+    """The single sheet of a DelimitedWorkbook"""
+
+    def __init__(self, workbook: DelimitedWorkbook, title: str):
+        self.parent = workbook
+        self.title = title
+
+    def iter_rows(self, min_row: int = 1, max_row: Optional[int] = None, min_col: int = 1,
+                  max_col: Optional[int] = None, values_only: bool = True) -> Iterator[Tuple]:
+        """Yield row value tuples like openpyxl's read-only ``iter_rows(values_only=True)``"""
+        if not values_only:
+            raise ValueError('DelimitedSheet only supports values_only=True')
+
+        width = None if max_col is None else max_col - min_col + 1
+        reader = csv.reader(self.parent.lines(), self.parent.dialect)
+        for row_number, record in enumerate(reader, start=1):
+            if max_row is not None and row_number > max_row:
+                break
+            if row_number < min_row:
+                continue
+
+            values = [value if value.strip() else None for value in record[min_col - 1:max_col]]
+            if width is not None and len(values) < width:
+                values.extend([None] * (width - len(values)))
+            yield tuple(values)
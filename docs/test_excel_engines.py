@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Excel Engine Test Script
+Checks that the ooxml reader returns exactly what openpyxl returns,
+and that CSV/TSV input reads like the equivalent workbook
+"""
+
+import io
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+def read_with(engine, data):
+    """Read a workbook with one engine, returning (dataframe, error, sheet frames)"""
+    from utils import ExcelProcessor
+    from config import get_config
+
+    class EngineConfig(get_config()):
+        EXCEL_ENGINE = engine
+
+    processor = ExcelProcessor(EngineConfig)
+    df, error = processor.read_excel(io.BytesIO(data))
+    sheets, _ = processor.read_excel_sheets(io.BytesIO(data))
+    return df, error, sheets
+
+def test_engines_agree_on_corpus():
+    """Both engines read every test workbook identically"""
+    print("=" * 60)
+    print("ENGINES: test_input_files corpus")
+    print("=" * 60)
+
+    paths = sorted(Path("test_input_files").glob("*.xlsx"))
+    assert paths, "No test workbooks found"
+    for path in paths:
+        data = path.read_bytes()
+        expected, expected_error, expected_sheets = read_with("openpyxl", data)
+        actual, actual_error, actual_sheets = read_with("ooxml", data)
+
+        assert expected_error == actual_error, f"{path.name}: {expected_error!r} != {actual_error!r}"
+        assert len(expected_sheets) == len(actual_sheets), f"{path.name}: different sheets"
+        if expected is not None:
+            assert actual is not None and expected.equals(actual), f"{path.name}: different first sheet"
+            assert expected.attrs == actual.attrs, f"{path.name}: {expected.attrs} != {actual.attrs}"
+        for (name, frame), (other_name, other_frame) in zip(expected_sheets, actual_sheets):
+            assert name == other_name and frame.equals(other_frame), f"{path.name}: sheet {name} differs"
+
+        print(f"✅ {path.name}")
+
+def test_ooxml_cell_types():
+    """Shared strings, numbers, booleans, dates and gaps decode like openpyxl"""
+    print("\n" + "=" * 60)
+    print("ENGINES: Cell types")
+    print("=" * 60)
+
+    from datetime import datetime
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Receipt register"])
+    sheet.append([])
+    sheet.append(["Payee Name", "Notes", "Amount", "Work"])
+    sheet.append(["Ravi", True, 1200, "Painting"])
+    sheet.append(["Sita", None, 350.75, datetime(2024, 4, 1)])
+    sheet.cell(row=8, column=1, value="Mohan")
+    sheet.cell(row=8, column=3, value="2,500")
+    sheet.cell(row=8, column=4, value="Wiring")
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    expected, _, _ = read_with("openpyxl", buffer.getvalue())
+    actual, _, _ = read_with("ooxml", buffer.getvalue())
+
+    assert expected is not None and actual is not None, "Workbook was not read"
+    assert expected.equals(actual), f"Engines differ:\n{expected}\n{actual}"
+    assert expected.attrs == actual.attrs, f"{expected.attrs} != {actual.attrs}"
+    print(f"✅ Header row {actual.attrs.get('header_row')}, {len(actual)} rows")
+    print(actual.to_string())
+
+def test_csv_matches_xlsx():
+    """CSV and UTF-16 TSV exports give the same receipts as the workbook"""
+    print("\n" + "=" * 60)
+    print("READERS: CSV/TSV")
+    print("=" * 60)
+
+    from utils import ExcelProcessor
+    from config import get_config
+
+    processor = ExcelProcessor(get_config())
+
+    def receipts(data):
+        df, error = processor.read_excel(io.BytesIO(data))
+        assert df is not None, error
+        payee_col, amount_col, work_col, _ = processor.find_columns(df)
+        return processor.process_data(df, payee_col, amount_col, work_col)
+
+    expected = receipts(Path("test_input_files", "small_test.xlsx").read_bytes())
+    assert expected, "Sample workbook gave no receipts"
+    text = ("Payee Name,Amount,Work\n"
+            "ABC Electric,1500.5,Street Light Installation\n"
+            "XYZ Contractors,2500,Transformer Repair\n"
+            "Power Solutions,1800.75,Cable Laying\n")
+
+    assert receipts(text.encode("utf-8")) == expected, "UTF-8 CSV differs from the workbook"
+    print("✅ UTF-8 CSV")
+    assert receipts(text.replace(",", "\t").encode("utf-16")) == expected, "UTF-16 TSV differs from the workbook"
+    print("✅ UTF-16 TSV")
+
+def main():
+    """Run all engine tests"""
+    tests = [
+        test_engines_agree_on_corpus,
+        test_ooxml_cell_types,
+        test_csv_matches_xlsx
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {str(e)}")
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)} tests")
+
+if __name__ == "__main__":
+    main()
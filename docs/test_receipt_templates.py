@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Receipt Template Test Script
+Checks the shared template registry: every format renders, and the
+per-receipt fragment cache is reused and invalidated correctly
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SAMPLE_RECEIPTS = [
+    {"payee": "ABC & Sons", "amount": 1500.5, "amount_words": "One Thousand Five Hundred", "work": "Street Light <Phase 2>"},
+    {"payee": "XYZ Contractors", "amount": 2500, "amount_words": "Two Thousand Five Hundred", "work": "Transformer Repair"}
+]
+
+def test_formats_render():
+    """Every configured format renders one container per receipt, with text escaped"""
+    print("=" * 60)
+    print("TEMPLATES: Receipt formats")
+    print("=" * 60)
+
+    from config import get_config
+    from template_registry import TemplateRegistry
+
+    registry = TemplateRegistry(get_config())
+    for name in registry.names():
+        html = registry.render(SAMPLE_RECEIPTS, name)
+        assert html.count('class="container"') == len(SAMPLE_RECEIPTS), f"{name}: wrong number of receipts"
+        assert "ABC &amp; Sons" in html and "&lt;Phase 2&gt;" in html, f"{name}: text not escaped"
+        assert html.rstrip().endswith("</html>"), f"{name}: document not closed"
+        print(f"✅ {name}: {len(html)} characters")
+
+def test_fragment_cache():
+    """Unchanged receipts reuse their fragment; a new context renders afresh"""
+    print("\n" + "=" * 60)
+    print("TEMPLATES: Fragment cache")
+    print("=" * 60)
+
+    from config import get_config
+    from template_registry import TemplateRegistry
+
+    registry = TemplateRegistry(get_config())
+    receipt_format = registry.format()
+
+    first = receipt_format.render(receipts=SAMPLE_RECEIPTS)
+    changed = SAMPLE_RECEIPTS[:1] + [dict(SAMPLE_RECEIPTS[1], amount=2600)]
+    receipt_format.render(receipts=changed)
+    info = registry.fragment_cache.cache_info()
+    assert info["hits"] == 1 and info["misses"] == 3, f"Unexpected cache use: {info}"
+    print(f"✅ Rerun with one changed receipt: {info}")
+
+    assert receipt_format.render(receipts=SAMPLE_RECEIPTS) == first, "Cached render differs from the first render"
+    print("✅ Cached render matches the first render")
+
+    other_division = receipt_format.render(receipts=SAMPLE_RECEIPTS, division="Test Division")
+    assert "Test Division" in other_division, "Division not rendered"
+    assert registry.fragment_cache.cache_info()["misses"] == 5, "Fragments reused across divisions"
+    print("✅ A different division renders new fragments")
+
+def main():
+    """Run all template tests"""
+    tests = [
+        test_formats_render,
+        test_fragment_cache
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {str(e)}")
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)} tests")
+
+if __name__ == "__main__":
+    main()
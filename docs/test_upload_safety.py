@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Upload Safety Test Script
+Checks that bad uploads are refused before they reach the Excel parser
+"""
+
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SAMPLE_FILE = Path("test_input_files") / "small_test.xlsx"
+
+def rebuild_workbook(modify):
+    """Copy the sample workbook, letting modify(name, data) rewrite each part"""
+    source = zipfile.ZipFile(SAMPLE_FILE)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for info in source.infolist():
+            archive.writestr(info.filename, modify(info.filename, source.read(info.filename)))
+    buffer.seek(0)
+    return buffer
+
+def build_ods(rows_xml):
+    """A minimal .ods whose only table holds the given <table:table-row> elements"""
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+        ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+        ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+        '<office:body><office:spreadsheet><table:table table:name="Sheet1">'
+        f'{rows_xml}'
+        '</table:table></office:spreadsheet></office:body></office:document-content>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet", zipfile.ZIP_STORED)
+        archive.writestr("content.xml", content)
+    buffer.seek(0)
+    return buffer
+
+def test_ingestion_rejects_bad_signature():
+    """Renamed non-Excel files are rejected from the first few KB"""
+    print("=" * 60)
+    print("INGESTION: Signature check")
+    print("=" * 60)
+
+    from ingest import UploadIngestor
+    from config import get_config
+
+    config = get_config()
+    ingestor = UploadIngestor(config)
+
+    upload = ingestor.open("renamed.xlsx")
+    upload.write(b"This is a text file, not a workbook" * 200)
+    assert upload.error, "Text file was accepted"
+    assert upload.tell() == 0, "Rejected upload was still spooled"
+    print(f"✅ Rejected while streaming, nothing kept: {upload.verify()}")
+
+    upload = ingestor.open("small_test.xlsx")
+    upload.write(SAMPLE_FILE.read_bytes())
+    error = upload.verify()
+    assert error == "", f"Real workbook rejected: {error}"
+    print("✅ Real workbook accepted")
+    print(f"   - SHA-256: {upload.sha256[:16]}...")
+
+def test_inspector_rejects_oversized_sheet():
+    """Declared sheet dimensions beyond the limits are refused before parsing"""
+    print("\n" + "=" * 60)
+    print("INSPECTOR: Oversized sheet")
+    print("=" * 60)
+
+    from utils import ExcelProcessor
+    from config import get_config
+
+    processor = ExcelProcessor(get_config())
+
+    def huge_dimension(name, data):
+        if name.startswith("xl/worksheets/"):
+            return data.replace(b'<dimension ref="A1:C4"/>', b'<dimension ref="A1:C9000000"/>')
+        return data
+
+    df, error = processor.read_excel(rebuild_workbook(huge_dimension))
+    assert df is None, "Oversized sheet was parsed"
+    assert "rows" in error, error
+    print("✅ Oversized sheet refused")
+    print(f"   - Message: {error}")
+
+def test_inspector_rejects_compression_bomb():
+    """Parts that expand far beyond their compressed size are refused"""
+    print("\n" + "=" * 60)
+    print("INSPECTOR: Compression bomb")
+    print("=" * 60)
+
+    from utils import ExcelProcessor
+    from config import get_config
+
+    processor = ExcelProcessor(get_config())
+
+    def padded_sheet(name, data):
+        if name.startswith("xl/worksheets/"):
+            return data + b" " * (20 * 1024 * 1024)
+        return data
+
+    bomb = rebuild_workbook(padded_sheet)
+    print(f"   - Compressed size: {len(bomb.getvalue())} bytes")
+    df, error = processor.read_excel(bomb)
+    assert df is None, "Compression bomb was parsed"
+    assert "compression ratio" in error, error
+    print("✅ Compression bomb refused")
+    print(f"   - Message: {error}")
+
+def test_ods_repeat_counts_are_bounded():
+    """A few hundred bytes of .ods repeating one cell millions of times is refused quickly"""
+    print("\n" + "=" * 60)
+    print("INSPECTOR: ODS repeat counts")
+    print("=" * 60)
+
+    import time
+    from ods_reader import ODSWorkbook
+    from utils import ExcelProcessor
+    from config import get_config
+
+    config = get_config()
+    processor = ExcelProcessor(config)
+    wide = ('<table:table-row><table:table-cell table:number-columns-repeated="20000000" office:value-type="string">'
+            '<text:p>Payee</text:p></table:table-cell></table:table-row>')
+    tall = ('<table:table-row><table:table-cell office:value-type="string"><text:p>Payee Name</text:p></table:table-cell>'
+            '<table:table-cell office:value-type="string"><text:p>Amount</text:p></table:table-cell>'
+            '<table:table-cell office:value-type="string"><text:p>Work</text:p></table:table-cell></table:table-row>'
+            '<table:table-row table:number-rows-repeated="20000000"><table:table-cell office:value-type="string">'
+            '<text:p>Ravi</text:p></table:table-cell><table:table-cell office:value-type="float" office:value="10"/>'
+            '<table:table-cell office:value-type="string"><text:p>Wiring</text:p></table:table-cell></table:table-row>')
+    # Blank filler as LibreOffice writes it must still be accepted
+    filler = ('<table:table-row><table:table-cell office:value-type="string"><text:p>Payee Name</text:p></table:table-cell>'
+              '<table:table-cell office:value-type="string"><text:p>Amount</text:p></table:table-cell>'
+              '<table:table-cell office:value-type="string"><text:p>Work</text:p></table:table-cell>'
+              '<table:table-cell table:number-columns-repeated="16381"/></table:table-row>'
+              '<table:table-row><table:table-cell office:value-type="string"><text:p>Ravi</text:p></table:table-cell>'
+              '<table:table-cell office:value-type="float" office:value="10"/>'
+              '<table:table-cell office:value-type="string"><text:p>Wiring</text:p></table:table-cell></table:table-row>'
+              '<table:table-row table:number-rows-repeated="1048574"><table:table-cell table:number-columns-repeated="16384"/>'
+              '</table:table-row>')
+
+    for name, rows_xml, what in (("Wide", wide, "columns"), ("Tall", tall, "rows")):
+        data = build_ods(rows_xml)
+        start = time.perf_counter()
+        df, error = processor.read_excel(data)
+        elapsed = time.perf_counter() - start
+        assert df is None and what in error, f"{name} sheet was not refused: {error}"
+        assert elapsed < 5, f"{name} sheet took {elapsed:.1f}s to refuse"
+        print(f"✅ {name} sheet ({len(data.getvalue())} bytes) refused in {elapsed:.2f}s: {error}")
+
+        # The reader itself stops expanding at the limits, even without the inspector
+        with ODSWorkbook(data, config.MAX_SHEET_ROWS, config.MAX_SHEET_COLUMNS) as workbook:
+            sheet = workbook.worksheets[0]
+            header = next(sheet.iter_rows(max_row=1))
+            assert len(header) <= config.MAX_SHEET_COLUMNS, f"{len(header)} header cells expanded"
+            count = sum(1 for _ in sheet.iter_rows())
+            assert count <= config.MAX_SHEET_ROWS, f"{count} rows expanded"
+
+    df, error = processor.read_excel(build_ods(filler))
+    assert df is not None and len(df) == 1, f"Blank filler refused: {error}"
+    print("✅ Blank filler rows and columns accepted")
+
+    error = processor._missing_columns_error([f"Column {n}" for n in range(5000)])
+    assert len(error) < 1000, "Header list not truncated"
+    print(f"✅ Header list truncated: {error[:80]}...")
+
+def main():
+    """Run all upload safety tests"""
+    tests = [
+        test_ingestion_rejects_bad_signature,
+        test_inspector_rejects_oversized_sheet,
+        test_inspector_rejects_compression_bomb,
+        test_ods_repeat_counts_are_bounded
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {str(e)}")
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)} tests")
+
+if __name__ == "__main__":
+    main()
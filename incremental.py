@@ -0,0 +1,206 @@
+import difflib
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from output_store import OutputStore
+from template_registry import ReceiptFormat, receipt_digest
+from utils import PDFGenerator
+from zip_stream import map_as_completed
+
+logger = logging.getLogger(__name__)
+
+def pdf_merge_available() -> bool:
+    """Whether pypdf, needed to splice per-receipt PDFs together, is installed"""
+    try:
+        import pypdf  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def diff_receipts(previous: List[Dict], current: List[Dict], limit: int) -> Dict:
+    """Row-level diff between the receipt manifests of two uploads of a ledger.
+
+    Rows are matched by content, so a row inserted near the top does not
+    mark every row below it as changed. Returns counts and up to ``limit``
+    rows, each ``{"row", "change"[, "sheet"]}``; removed rows are numbered
+    as they were in the previous upload.
+    """
+    matcher = difflib.SequenceMatcher(None, [entry["digest"] for entry in previous],
+                                      [entry["digest"] for entry in current], autojunk=False)
+    changes = {"added": 0, "changed": 0, "removed": 0}
+    rows = []
+
+    def note(entry, change):
+        changes[change] += 1
+        if len(rows) < limit:
+            row = {"row": entry["row"], "change": change}
+            if entry.get("sheet"):
+                row["sheet"] = entry["sheet"]
+            rows.append(row)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for entry in current[j1:j1 + paired]:
+            note(entry, "changed")
+        for entry in current[j1 + paired:j2]:
+            note(entry, "added")
+        for entry in previous[i1 + paired:i2]:
+            note(entry, "removed")
+
+    changes["rows"] = rows
+    return changes
+
+class IncrementalRenderer:
+    """Re-renders only the receipts of a ledger that changed since it was last uploaded.
+
+    Each receipt is rendered to its own PDF and kept in the OutputStore
+    under a key derived from its content, the receipt format's template
+    version and the PDF options. A combined PDF is the pages spliced
+    together with pypdf, so re-uploading a ledger with one corrected row
+    renders one receipt. The last receipt manifest of every ledger is kept
+    in the store too, so the response can report which rows changed.
+
+    A ledger seen for the first time is rendered in one wkhtmltopdf pass,
+    like any other upload; when that gives one page per receipt the pages
+    are split out and stored so the next upload can reuse them.
+    """
+
+    def __init__(self, config: Config, output_store: OutputStore, pdf_generator: PDFGenerator,
+                 receipt_format: ReceiptFormat):
+        self.config = config
+        self.output_store = output_store
+        self.pdf_generator = pdf_generator
+        self.receipt_format = receipt_format
+        self.max_workers = config.RENDER_WORKERS
+
+    def render(self, ledger_key: str, receipts: List) -> Tuple[Optional[str], Optional[Dict]]:
+        """Render receipts into a temporary combined PDF.
+
+        Returns (pdf path, report). The report counts the receipts
+        ``rendered`` and ``reused`` and, if the ledger was uploaded before,
+        the rows changed since then (see ``diff_receipts``). Both are None if
+        a receipt could not be rendered.
+        """
+        from pypdf import PdfWriter
+
+        version = self._version()
+        manifest = [self._manifest_entry(receipt, version) for receipt in receipts]
+        ledger_key = OutputStore.make_key('ledger', hashlib.sha256(ledger_key.encode('utf-8')).hexdigest())
+
+        with self.output_store.hold(ledger_key):
+            previous = self._read_manifest(ledger_key)
+            if previous is None:
+                pdf_path = self._render_whole(manifest, receipts)
+                if pdf_path is None:
+                    return None, None
+                self.output_store.put_bytes(json.dumps(manifest).encode('utf-8'), "ledger.json",
+                                            'application/json', key=ledger_key)
+                logger.info(f"New ledger: {len(receipts)} receipts rendered in one pass")
+                return pdf_path, {"rendered": len(receipts), "reused": 0}
+
+            # Only receipts whose page is not stored yet go through the template and wkhtmltopdf
+            pages = {entry["page"]: self.output_store.lookup(entry["page"]) for entry in manifest}
+            missing = {entry["page"]: receipt for entry, receipt in zip(manifest, receipts) if not pages[entry["page"]]}
+            for (page_key, _), output_id in map_as_completed(self._render_page, list(missing.items()), self.max_workers):
+                if output_id is None:
+                    return None, None
+                pages[page_key] = output_id
+
+            writer = PdfWriter()
+            for entry, receipt in zip(manifest, receipts):
+                page = self.output_store.get(pages[entry["page"]])
+                if page is None:
+                    # Evicted while this ledger was being assembled
+                    output_id = self._render_page((entry["page"], receipt))
+                    page = output_id and self.output_store.get(output_id)
+                    if page is None:
+                        return None, None
+                writer.append(page["path"])
+
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_file:
+                writer.write(pdf_file)
+            writer.close()
+
+            self.output_store.put_bytes(json.dumps(manifest).encode('utf-8'), "ledger.json",
+                                        'application/json', key=ledger_key)
+
+        report = {"rendered": len(missing), "reused": len(receipts) - len(missing)}
+        if previous is not None:
+            report.update(diff_receipts(previous, manifest, self.config.CHANGED_ROWS_REPORT_LIMIT))
+        logger.info(f"Ledger render: {report['rendered']} of {len(receipts)} receipts rendered, the rest reused")
+        return pdf_file.name, report
+
+    def _render_whole(self, manifest: List[Dict], receipts: List) -> Optional[str]:
+        """Render all receipts into one temporary PDF, storing each page when there is one per receipt"""
+        from pypdf import PdfReader, PdfWriter
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_file:
+            pass
+        if not self.pdf_generator.generate_pdf(self.receipt_format.generate(receipts=receipts), pdf_file.name):
+            logger.error("PDF generation failed for a new ledger")
+            try:
+                os.unlink(pdf_file.name)
+            except OSError:
+                pass
+            return None
+
+        reader = PdfReader(pdf_file.name)
+        if len(reader.pages) != len(receipts):
+            # A receipt spilled onto a second page; later uploads render pages one by one
+            logger.info(f"{len(reader.pages)} pages for {len(receipts)} receipts; pages not stored")
+            return pdf_file.name
+        for entry, page in zip(manifest, reader.pages):
+            if self.output_store.lookup(entry["page"]):
+                continue
+            writer = PdfWriter()
+            writer.add_page(page)
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            self.output_store.put_bytes(buffer.getvalue(), "receipt.pdf", 'application/pdf', key=entry["page"])
+        return pdf_file.name
+
+    def _render_page(self, item) -> Optional[str]:
+        """Render one receipt to a stored PDF page, returning its output ID"""
+        page_key, receipt = item
+        pdf_bytes = self.pdf_generator.generate_pdf_bytes(self.receipt_format.generate(receipts=[receipt]))
+        if pdf_bytes is None:
+            logger.error(f"PDF generation failed for row {receipt.get('row')}")
+            return None
+        return self.output_store.put_bytes(pdf_bytes, "receipt.pdf", 'application/pdf', key=page_key)
+
+    def _version(self) -> str:
+        """Everything besides the receipt itself that changes a rendered page"""
+        template_version = self.receipt_format.version(dict(self.receipt_format.context))
+        options = json.dumps(self.config.PDF_OPTIONS, sort_keys=True)
+        return hashlib.sha256(f"{template_version}\0{options}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _manifest_entry(receipt, version: str) -> Dict:
+        digest = receipt_digest(receipt)
+        entry = {
+            "row": receipt.get("row"),
+            "digest": digest,
+            "page": OutputStore.make_key('receipt-pdf', hashlib.sha256(f"{version}{digest}".encode('utf-8')).hexdigest())
+        }
+        if receipt.get("sheet"):
+            entry["sheet"] = receipt.get("sheet")
+        return entry
+
+    def _read_manifest(self, ledger_key: str) -> Optional[List[Dict]]:
+        output_id = self.output_store.lookup(ledger_key)
+        output = output_id and self.output_store.get(output_id)
+        if not output:
+            return None
+        try:
+            with open(output["path"], 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,221 @@
+import codecs
+import hashlib
+import logging
+import os
+import struct
+import zipfile
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# ZIP local file header signature; every OOXML workbook starts with it
+ZIP_MAGIC = b'PK\x03\x04'
+
+# Members whose presence in the central directory identifies each ZIP-based format
+REQUIRED_MEMBERS = {
+    '.xlsx': ('[Content_Types].xml', 'xl/workbook.xml'),
+    '.ods': ('mimetype', 'content.xml'),
+}
+
+# Plain-text formats; their first bytes must look like text rather than a binary file
+TEXT_EXTENSIONS = ('.csv', '.tsv')
+UTF16_BOMS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+class UploadRejected(Exception):
+    """Raised by the format checks; recorded on the IngestedFile as its rejection"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def check_head(config: Config, extension: str, head: bytes):
+    """Check the magic bytes of an upload: a ZIP local file header, or plain text for CSV/TSV"""
+    if extension in TEXT_EXTENSIONS:
+        # NUL bytes only appear in text as UTF-16, which starts with a BOM
+        if head.startswith(ZIP_MAGIC) or (b'\x00' in head and not head.startswith(UTF16_BOMS)):
+            raise UploadRejected(config.ERROR_MESSAGES['invalid_format'])
+        return
+    if extension not in REQUIRED_MEMBERS:
+        return
+
+    if not head.startswith(ZIP_MAGIC) or len(head) < 30:
+        raise UploadRejected(config.ERROR_MESSAGES['invalid_format'])
+
+    compression, = struct.unpack('<H', head[8:10])
+    name_length, = struct.unpack('<H', head[26:28])
+    if compression not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) or not 0 < name_length <= 1024:
+        raise UploadRejected(config.ERROR_MESSAGES['invalid_format'])
+
+def check_central_directory(config: Config, extension: str, file_stream):
+    """Read only the central directory and require the format's key members"""
+    required = REQUIRED_MEMBERS.get(extension)
+    if not required:
+        return
+
+    file_stream.seek(0)
+    try:
+        with zipfile.ZipFile(file_stream) as archive:
+            names = set(archive.namelist())
+    except (zipfile.BadZipFile, OSError, ValueError):
+        raise UploadRejected(config.ERROR_MESSAGES['invalid_format'])
+
+    if not all(member in names for member in required):
+        raise UploadRejected(config.ERROR_MESSAGES['invalid_format'])
+
+def verify_file(config: Config, filename: str, file_stream) -> str:
+    """Run the ingestion checks on a complete file (e.g. an assembled chunked upload); returns an error or ''"""
+    extension = os.path.splitext((filename or '').lower())[1]
+    if extension not in config.ALLOWED_EXTENSIONS:
+        return config.ERROR_MESSAGES['invalid_extension']
+    try:
+        file_stream.seek(0)
+        head = file_stream.read(config.SIGNATURE_PROBE_SIZE)
+        if not head:
+            return config.ERROR_MESSAGES['empty_file']
+        check_head(config, extension, head)
+        check_central_directory(config, extension, file_stream)
+    except UploadRejected as e:
+        return e.message
+    finally:
+        file_stream.seek(0)
+    return ""
+
+class IngestedFile:
+    """Writable/readable spool that validates and hashes an upload as it arrives.
+
+    Werkzeug's form parser writes each file part into this object chunk by
+    chunk. The size limit and format signature are checked on the way in,
+    so an oversized or mislabelled upload stops being spooled after its
+    first few KB. The rejection is kept on the file (``error`` and
+    ``status_code``) and reported by ``verify()``, rather than raised out of
+    the form parser, so one bad file in a batch does not fail the others.
+    """
+
+    def __init__(self, config: Config, filename: Optional[str]):
+        self.config = config
+        self.filename = filename or ''
+        self.extension = os.path.splitext(self.filename.lower())[1]
+        self.size = 0
+        self.error = ""
+        self.status_code = 200
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self._checked_head = False
+        self._file = SpooledTemporaryFile(max_size=config.UPLOAD_SPOOL_MAX_MEMORY, dir=config.TEMP_DIR)
+
+        if self.extension not in config.ALLOWED_EXTENSIONS:
+            self.reject(config.ERROR_MESSAGES['invalid_extension'])
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of everything written so far"""
+        return self._digest.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        if self.error:
+            # Rejected: the rest of this part is read by the form parser but not kept
+            return len(data)
+
+        self.size += len(data)
+        if self.size > self.config.MAX_CONTENT_LENGTH:
+            self.reject(self.config.ERROR_MESSAGES['file_too_large'], 413)
+            return len(data)
+
+        if not self._checked_head:
+            self._head += data[:self.config.SIGNATURE_PROBE_SIZE - len(self._head)]
+            if len(self._head) >= self.config.SIGNATURE_PROBE_SIZE:
+                try:
+                    self._check_head()
+                except UploadRejected as e:
+                    self.reject(e.message, e.status_code)
+                    return len(data)
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def reject(self, message: str, status_code: int = 400):
+        """Record why the upload is refused and drop what was spooled so far"""
+        if not self.error:
+            self.error = message
+            self.status_code = status_code
+            self._file.seek(0)
+            self._file.truncate()
+
+    def verify(self) -> str:
+        """Finish validation once the upload is complete; returns an error message or ''"""
+        if self.error:
+            return self.error
+        if self.size == 0:
+            return self.config.ERROR_MESSAGES['empty_file']
+        try:
+            if not self._checked_head:
+                self._check_head()
+            self._check_central_directory()
+        except UploadRejected as e:
+            self.reject(e.message, e.status_code)
+            return e.message
+        finally:
+            self._file.seek(0)
+        return ""
+
+    def _check_head(self):
+        self._checked_head = True
+        check_head(self.config, self.extension, self._head)
+
+    def _check_central_directory(self):
+        check_central_directory(self.config, self.extension, self._file)
+
+    # Remaining file-like methods used by Werkzeug, pandas and openpyxl
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        return self._file.flush()
+
+    def close(self):
+        return self._file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class UploadIngestor:
+    """Creates IngestedFile spools for incoming uploads"""
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    def open(self, filename: Optional[str], content_length: Optional[int] = None) -> IngestedFile:
+        """Start ingesting an upload; rejects up front when the declared length is too big"""
+        ingested = IngestedFile(self.config, filename)
+        if content_length and content_length > self.config.MAX_CONTENT_LENGTH:
+            ingested.reject(self.config.ERROR_MESSAGES['file_too_large'], 413)
+        return ingested
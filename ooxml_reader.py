@@ -0,0 +1,260 @@
+import posixpath
+import re
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from xml.etree.ElementTree import iterparse
+
+# Transitional (what Excel writes) and Strict SpreadsheetML namespaces
+_MAIN_NAMESPACES = (
+    'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'http://purl.oclc.org/ooxml/spreadsheetml/main',
+)
+_REL_NAMESPACES = (
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'http://purl.oclc.org/ooxml/officeDocument/relationships',
+)
+_PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+def _tags(name: str) -> Set[str]:
+    return {f'{{{namespace}}}{name}' for namespace in _MAIN_NAMESPACES}
+
+_ROW, _CELL, _VALUE, _INLINE, _TEXT, _RUN = (_tags(name) for name in ('row', 'c', 'v', 'is', 't', 'r'))
+_SHARED_ITEM, _SHEET, _DIMENSION, _WORKBOOK_PR = (_tags(name) for name in ('si', 'sheet', 'dimension', 'workbookPr'))
+_CELL_XFS, _XF, _NUM_FMT = (_tags(name) for name in ('cellXfs', 'xf', 'numFmt'))
+
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+@lru_cache(maxsize=4096)
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + (ord(letter) - 64)
+    return number
+
+def _cast_number(value: str):
+    """Numbers come back as int or float, exactly as openpyxl returns them"""
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+    return int(value)
+
+def _rich_text(element) -> str:
+    """Text of a shared or inline string: a plain <t> or the <t> of each run"""
+    parts = []
+    for child in element:
+        if child.tag in _TEXT:
+            parts.append(child.text or '')
+        elif child.tag in _RUN:
+            for text in child:
+                if text.tag in _TEXT:
+                    parts.append(text.text or '')
+    return ''.join(parts)
+
+class OOXMLWorkbook:
+    """Minimal read-only .xlsx reader for the few columns receipts need.
+
+    Sheets are streamed straight out of the ZIP with an incremental XML
+    parser. Only cells inside the requested column span are decoded and
+    parsing stops at the last requested row, so nothing like openpyxl's
+    style, cell and worksheet object model is built. The interface mirrors
+    the slice of openpyxl's read-only workbook that ExcelProcessor uses
+    (``worksheets``, ``title``, ``iter_rows(..., values_only=True)``,
+    ``close``), so the header sniffing and column projection code is shared.
+    """
+
+    def __init__(self, file_stream):
+        self._archive = zipfile.ZipFile(file_stream)
+        self._shared_strings = None
+        self._date_styles = None
+        self.epoch_1904 = False
+        self.worksheets = self._read_sheets()
+
+    def close(self):
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def shared_strings(self) -> List[str]:
+        """Shared string table, parsed on first use"""
+        if self._shared_strings is None:
+            self._shared_strings = []
+            if 'xl/sharedStrings.xml' in self._archive.NameToInfo:
+                with self._archive.open('xl/sharedStrings.xml') as part:
+                    for _, element in iterparse(part):
+                        if element.tag in _SHARED_ITEM:
+                            self._shared_strings.append(_rich_text(element))
+                            element.clear()
+        return self._shared_strings
+
+    def date_style(self, style: str):
+        """Return 'date' or 'timedelta' if cell style index ``style`` formats dates"""
+        if self._date_styles is None:
+            self._date_styles = self._read_date_styles()
+        return self._date_styles.get(style)
+
+    def _read_sheets(self) -> List['OOXMLWorksheet']:
+        """Worksheets in workbook order, resolved through the workbook relationships"""
+        targets = {}
+        with self._archive.open('xl/_rels/workbook.xml.rels') as part:
+            for _, element in iterparse(part):
+                if element.tag == _PACKAGE_RELS and element.get('Type', '').endswith('/worksheet'):
+                    target = element.get('Target', '')
+                    path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+                    targets[element.get('Id')] = path
+
+        sheets = []
+        with self._archive.open('xl/workbook.xml') as part:
+            for _, element in iterparse(part):
+                if element.tag in _WORKBOOK_PR:
+                    self.epoch_1904 = element.get('date1904', '').lower() in ('1', 'true')
+                elif element.tag in _SHEET:
+                    rel_id = next((element.get(f'{{{ns}}}id') for ns in _REL_NAMESPACES if element.get(f'{{{ns}}}id')), None)
+                    # Chartsheets and dialog sheets have no worksheet relationship
+                    if rel_id in targets:
+                        sheets.append(OOXMLWorksheet(self, element.get('name', ''), targets[rel_id]))
+        return sheets
+
+    def _read_date_styles(self) -> Dict[str, str]:
+        """Map cell style indexes whose number format is a date or duration"""
+        if 'xl/styles.xml' not in self._archive.NameToInfo:
+            return {}
+        from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+        formats = dict(BUILTIN_FORMATS)
+        cell_formats = []
+        in_cell_xfs = False
+        with self._archive.open('xl/styles.xml') as part:
+            for event, element in iterparse(part, events=('start', 'end')):
+                if element.tag in _CELL_XFS:
+                    in_cell_xfs = event == 'start'
+                elif event == 'end' and element.tag in _NUM_FMT:
+                    formats[int(element.get('numFmtId', 0))] = element.get('formatCode', '')
+                elif event == 'end' and in_cell_xfs and element.tag in _XF:
+                    cell_formats.append(int(element.get('numFmtId', 0)))
+
+        styles = {}
+        for index, format_id in enumerate(cell_formats):
+            code = formats.get(format_id, '')
+            if is_timedelta_format(code):
+                styles[str(index)] = 'timedelta'
+            elif is_date_format(code):
+                styles[str(index)] = 'date'
+        return styles
+
+class OOXMLWorksheet:
+    """One worksheet of an OOXMLWorkbook; rows are parsed lazily on iteration"""
+
+    def __init__(self, workbook: OOXMLWorkbook, title: str, path: str):
+        self.parent = workbook
+        self.title = title
+        self._path = path
+        self._width = None
+
+    def iter_rows(self, min_row: int = 1, max_row: Optional[int] = None, min_col: int = 1,
+                  max_col: Optional[int] = None, values_only: bool = True) -> Iterator[Tuple]:
+        """Yield row value tuples like openpyxl's read-only ``iter_rows(values_only=True)``.
+
+        Missing rows between ``min_row`` and the last row present come back
+        as empty tuples of the requested width; cells left of ``min_col`` or
+        right of ``max_col`` are skipped without being decoded.
+        """
+        if not values_only:
+            raise ValueError('OOXMLWorksheet only supports values_only=True')
+
+        width = None if max_col is None else max_col - min_col + 1
+        counter = min_row
+        row_number = 0
+
+        with self.parent._archive.open(self._path) as part:
+            for _, element in iterparse(part):
+                tag = element.tag
+                if tag in _DIMENSION:
+                    self._set_width(element.get('ref', ''))
+                    if width is None and self._width:
+                        width = self._width - min_col + 1
+                    continue
+                if tag not in _ROW:
+                    continue
+
+                row_number = int(element.get('r') or row_number + 1)
+                if max_row is not None and row_number > max_row:
+                    break
+                if row_number < min_row:
+                    element.clear()
+                    continue
+
+                while counter < row_number:
+                    counter += 1
+                    yield (None,) * (width or 0)
+
+                yield self._row_values(element, min_col, max_col, width)
+                counter += 1
+                element.clear()
+
+    def _set_width(self, ref: str):
+        matches = _CELL_REF.findall(ref.upper())
+        if matches:
+            self._width = max(_column_number(letters) for letters, _ in matches)
+
+    def _row_values(self, row, min_col: int, max_col: Optional[int], width: Optional[int]) -> Tuple:
+        values = {}
+        column = 0
+        for cell in row:
+            if cell.tag not in _CELL:
+                continue
+            ref = cell.get('r')
+            column = _column_number(ref.rstrip('0123456789')) if ref else column + 1
+            if column < min_col:
+                continue
+            if max_col is not None and column > max_col:
+                # Cells are stored in column order, so the rest of the row is out of range
+                break
+            values[column - min_col] = self._cell_value(cell)
+
+        if width is None:
+            width = max(values) + 1 if values else 0
+        row_values = [None] * width
+        for offset, value in values.items():
+            if offset < width:
+                row_values[offset] = value
+        return tuple(row_values)
+
+    def _cell_value(self, cell):
+        data_type = cell.get('t', 'n')
+
+        if data_type == 'inlineStr':
+            inline = next((child for child in cell if child.tag in _INLINE), None)
+            return _rich_text(inline) if inline is not None else None
+
+        value = next((child.text for child in cell if child.tag in _VALUE), None)
+        if value is None:
+            return None
+
+        if data_type == 's':
+            return self.parent.shared_strings[int(value)]
+        if data_type == 'n':
+            number = _cast_number(value)
+            style = cell.get('s')
+            if style and style != '0':
+                kind = self.parent.date_style(style)
+                if kind:
+                    return self._to_datetime(number, kind)
+            return number
+        if data_type == 'b':
+            return bool(int(value))
+        if data_type == 'd':
+            from openpyxl.utils.datetime import from_ISO8601
+            return from_ISO8601(value)
+        # 'str' (formula result) and 'e' (error such as #N/A) are returned as text
+        return value
+
+    def _to_datetime(self, number, kind: str):
+        from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+        epoch = CALENDAR_MAC_1904 if self.parent.epoch_1904 else CALENDAR_WINDOWS_1900
+        return from_excel(number, epoch, timedelta=kind == 'timedelta')
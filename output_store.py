@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class OutputStore:
+    """Content-addressed store for generated outputs (PDFs etc.) on local disk.
+
+    Each output is identified by the SHA-256 of its bytes, which doubles as a
+    strong ETag. Optional input keys (e.g. the hash of an uploaded workbook)
+    map to output IDs so an identical request can be answered without
+    re-rendering. Everything lives on disk, so all workers on a host share it.
+    """
+
+    def __init__(self, config: Config, directory: Optional[str] = None):
+        self.config = config
+        self.directory = directory or os.path.join(config.TEMP_DIR, 'receipt_outputs')
+        self.max_bytes = config.OUTPUT_STORE_MAX_BYTES
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put_file(self, path: str, download_name: str, mimetype: str, key: Optional[str] = None,
+                 key_info: Optional[Dict] = None) -> str:
+        """Move a finished file into the store and return its output ID.
+
+        ``key_info`` is kept with the input key (e.g. rows rejected while
+        parsing that input) and returned by ``lookup_info``.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.config.CHUNK_SIZE * 8), b''):
+                digest.update(chunk)
+        output_id = digest.hexdigest()
+
+        with self._lock:
+            target = self._data_path(output_id)
+            if os.path.exists(target):
+                # Identical content is already stored; just refresh its age
+                os.unlink(path)
+                os.utime(target)
+            else:
+                shutil.move(path, target)
+            self._write_json(self._meta_path(output_id), {
+                "download_name": download_name,
+                "mimetype": mimetype,
+                "size": os.path.getsize(target)
+            })
+            if key:
+                self._write_json(self._key_path(key), {**(key_info or {}), "output_id": output_id})
+            self._evict()
+
+        return output_id
+
+    def put_bytes(self, data: bytes, download_name: str, mimetype: str, key: Optional[str] = None,
+                  key_info: Optional[Dict] = None) -> str:
+        """Store in-memory output and return its output ID"""
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as tmp_file:
+            tmp_file.write(data)
+        return self.put_file(tmp_file.name, download_name, mimetype, key=key, key_info=key_info)
+
+    def get(self, output_id: str) -> Optional[Dict]:
+        """Return path and metadata for an output, or None if unknown or evicted.
+
+        A hit refreshes the output's mtime, so eviction drops the least
+        recently used outputs rather than the oldest stored.
+        """
+        if not self.is_sha256(output_id):
+            return None
+        path = self._data_path(output_id)
+        meta = self._read_json(self._meta_path(output_id))
+        if meta is None:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return {"output_id": output_id, "path": path, **meta}
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the output ID previously stored under an input key"""
+        info = self.lookup_info(key)
+        return info["output_id"] if info else None
+
+    def lookup_info(self, key: str) -> Optional[Dict]:
+        """Return the output ID and key_info stored under an input key"""
+        ref = self._read_json(self._key_path(key))
+        if ref is None:
+            return None
+        output_id = ref.get("output_id")
+        return ref if output_id and self.get(output_id) else None
+
+    @contextmanager
+    def hold(self, key: str):
+        """Serialise work on one input key across threads and worker processes.
+
+        The first caller renders; concurrent duplicates (e.g. a double-clicked
+        submit) wait here and then find the result through ``lookup``. A lock
+        file older than ``RENDER_LOCK_TIMEOUT`` is treated as abandoned.
+        """
+        lock_path = f"{self._key_path(key)}.lock"
+        deadline = time.time() + self.config.RENDER_LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    stale = time.time() - os.path.getmtime(lock_path) > self.config.RENDER_LOCK_TIMEOUT
+                except OSError:
+                    stale = False
+                if stale or time.time() > deadline:
+                    logger.warning(f"Taking over render lock for {key}")
+                    break
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            try:
+                os.unlink(lock_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def make_key(kind: str, digest: str) -> str:
+        """Build an input key from an output kind and an input content hash"""
+        return f"{kind}:{digest}"
+
+    def _evict(self):
+        """Delete least recently used outputs, and the input keys pointing at them, until under the byte budget"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.out'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+            total += stat.st_size
+
+        entries.sort()
+        evicted = set()
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, output_id = entries.pop(0)
+            for path in (self._data_path(output_id), self._meta_path(output_id)):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted.add(output_id)
+            logger.debug(f"Evicted stored output {output_id}")
+        if evicted:
+            self._evict_keys(evicted)
+
+    def _evict_keys(self, evicted: set):
+        """Delete input keys that point at evicted (or otherwise missing) outputs"""
+        for name in os.listdir(self.directory):
+            if not (name.startswith('key-') and name.endswith('.json')):
+                continue
+            path = os.path.join(self.directory, name)
+            ref = self._read_json(path)
+            output_id = ref.get("output_id") if ref else None
+            if not output_id or output_id in evicted or not os.path.exists(self._data_path(output_id)):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def is_sha256(value: str) -> bool:
+        """Check that a value is a lowercase hex SHA-256 digest (the output ID format)"""
+        return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+    def _data_path(self, output_id: str) -> str:
+        return os.path.join(self.directory, f"{output_id}.out")
+
+    def _meta_path(self, output_id: str) -> str:
+        return os.path.join(self.directory, f"{output_id}.json")
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"key-{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path: str, data: Dict):
+        # Write then rename so readers in other workers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+class ResultStore:
+    """Process-wide store of generated results, shared by all sessions of a server.
+
+    Results are kept in memory under the SHA-256 of their bytes, so identical
+    outputs generated by different sessions are stored once; sessions hold
+    only that handle. Memory is bounded by ``RESULT_STORE_MAX_BYTES`` with
+    least recently used eviction. With ``RESULT_STORE_SPILL`` evicted (or
+    oversized) results move to an OutputStore on disk instead of being
+    dropped, and are read back from there on demand. Without it, ``put``
+    returns None for a result larger than the whole budget.
+    """
+
+    def __init__(self, config: Config, output_store: Optional[OutputStore] = None):
+        self.config = config
+        self.max_bytes = config.RESULT_STORE_MAX_BYTES
+        self.output_store = output_store if config.RESULT_STORE_SPILL else None
+        self._results = OrderedDict()  # handle -> (data, download name, mimetype)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+
+    def put(self, data: bytes, download_name: str, mimetype: str) -> Optional[str]:
+        """Store a result and return its handle (the SHA-256 of ``data``), or None if it cannot be kept"""
+        handle = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if handle in self._results:
+                self._results.move_to_end(handle)
+                return handle
+            if len(data) <= self.max_bytes:
+                self._results[handle] = (data, download_name, mimetype)
+                self._bytes += len(data)
+                spill = self._evict()
+            elif self.output_store is not None:
+                spill = [(handle, (data, download_name, mimetype))]
+            else:
+                logger.warning(f"Result {handle} ({len(data)} bytes) exceeds RESULT_STORE_MAX_BYTES "
+                               "and RESULT_STORE_SPILL is off; not stored")
+                return None
+        # Disk writes happen outside the lock so other sessions are not held up
+        for spilled_handle, result in spill:
+            self._spill(spilled_handle, *result)
+        return handle
+
+    def get(self, handle: str) -> Optional[Dict]:
+        """Return ``{"handle", "data", "download_name", "mimetype"}``, or None if the result is gone"""
+        with self._lock:
+            result = self._results.get(handle)
+            if result is not None:
+                self._results.move_to_end(handle)
+                self.hits += 1
+        if result is None:
+            result = self._read_spilled(handle)
+            with self._lock:
+                if result is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+        data, download_name, mimetype = result
+        return {"handle": handle, "data": data, "download_name": download_name, "mimetype": mimetype}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._results), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "spilled": self.spilled}
+
+    def _evict(self) -> List[Tuple[str, Tuple[bytes, str, str]]]:
+        """Drop least recently used results until under the byte budget (caller holds the lock).
+
+        Returns the dropped results, for the caller to spill once the lock is released.
+        """
+        dropped = []
+        while self._bytes > self.max_bytes and self._results:
+            handle, result = self._results.popitem(last=False)
+            self._bytes -= len(result[0])
+            dropped.append((handle, result))
+        return dropped
+
+    def _spill(self, handle: str, data: bytes, download_name: str, mimetype: str):
+        if self.output_store is None:
+            return
+        self.output_store.put_bytes(data, download_name, mimetype)
+        with self._lock:
+            self.spilled += 1
+        logger.debug(f"Spilled result {handle} to the output store")
+
+    def _read_spilled(self, handle: str) -> Optional[Tuple[bytes, str, str]]:
+        output = self.output_store.get(handle) if self.output_store else None
+        if output is None:
+            return None
+        try:
+            with open(output["path"], 'rb') as f:
+                return f.read(), output["download_name"], output["mimetype"]
+        except OSError:
+            return None
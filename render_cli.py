@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Render CLI
+Renders receipt PDFs for workbooks without starting Flask or Streamlit,
+one worker process per workbook at a time.
+
+Usage: python render_cli.py INPUT [INPUT ...] [-o OUTPUT_DIR] [-j WORKERS] [--format NAME] [--max-rows N] [--force]
+
+INPUT may be a workbook, a directory (its .xlsx/.ods/.csv/.tsv files) or a
+glob such as "ledgers/2024-*/*.xlsx". Each workbook becomes OUTPUT_DIR/<name>.pdf.
+A manifest in OUTPUT_DIR records the SHA-256 of every input and the template
+version it was rendered with; unchanged inputs are skipped on the next run.
+Every row is rendered unless --max-rows is given; a workbook with more rows
+than that fails rather than being cut short. The exit code is 1 if any
+workbook failed, so cron can report it.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from batch import parse_workbook
+from config import Config, get_config
+from template_registry import get_template_registry
+from utils import PDFGenerator
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.receipts-manifest.json'
+
+def find_inputs(patterns: List[str], extensions) -> List[str]:
+    """Expand files, directories and globs into workbook paths (each once, in the order given)"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for path in matches:
+            if os.path.splitext(path.lower())[1] in extensions and not os.path.basename(path).startswith('~$'):
+                paths.append(os.path.abspath(path))
+    return list(dict.fromkeys(paths))
+
+def output_names(paths: List[str]) -> Dict[str, str]:
+    """PDF file name for each input; inputs with the same stem get a numeric suffix"""
+    names, used = {}, set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, counter = f"{stem}.pdf", 2
+        while name.lower() in used:
+            name, counter = f"{stem}_{counter}.pdf", counter + 1
+        used.add(name.lower())
+        names[path] = name
+    return names
+
+def file_digest(path: str, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def render_version(config: Config, format_name: str) -> str:
+    """Everything besides the workbook that changes the rendered PDF"""
+    receipt_format = get_template_registry(config).format(format_name)
+    template_version = receipt_format.version(dict(receipt_format.context))
+    options = json.dumps(config.PDF_OPTIONS, sort_keys=True)
+    return hashlib.sha256(f"{template_version}\0{options}".encode('utf-8')).hexdigest()
+
+def render_workbook(config_name: Optional[str], path: str, output_path: str, format_name: str,
+                    max_rows: int) -> Dict:
+    """Parse one workbook and render its receipts to ``output_path`` (runs inside a worker process)"""
+    start = time.perf_counter()
+    config = get_config(config_name)
+    with open(path, 'rb') as f:
+        result = parse_workbook(config_name, os.path.basename(path), f.read(), max_rows)
+    report = {"receipts": len(result["receipts"]), "rejected": len(result["rejected"]), "error": result["error"]}
+    if result["truncated"] and not report["error"]:
+        report["error"] = config.ERROR_MESSAGES['rows_truncated'].format(max_rows=max_rows)
+
+    if not report["error"]:
+        receipt_format = get_template_registry(config).format(format_name)
+        # Written beside the target and renamed, so an interrupted run never leaves a partial PDF
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        if PDFGenerator(config).generate_pdf(receipt_format.generate(receipts=result["receipts"]), tmp_path):
+            os.replace(tmp_path, output_path)
+        else:
+            report["error"] = config.ERROR_MESSAGES['pdf_error']
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def read_manifest(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_manifest(path: str, manifest: Dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Render receipt PDFs for workbooks in parallel")
+    parser.add_argument('inputs', nargs='+', help="workbooks, directories or globs")
+    parser.add_argument('-o', '--output-dir', default='receipts', help="where PDFs are written (default: receipts)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--format', default=config.DEFAULT_RECEIPT_FORMAT, choices=list(config.RECEIPT_FORMATS),
+                        help="receipt format")
+    parser.add_argument('--max-rows', type=int, default=0,
+                        help="fail workbooks with more data rows than this (default: no limit)")
+    parser.add_argument('--force', action='store_true', help="render even if the output is up to date")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config_name = os.environ.get('FLASK_ENV')
+
+    paths = find_inputs(args.inputs, config.ALLOWED_EXTENSIONS)
+    if not paths:
+        print("No workbooks found", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    manifest = read_manifest(manifest_path)
+    # A different row limit can change the outcome, so it is part of the version too
+    version = hashlib.sha256(f"{render_version(config, args.format)}\0{args.max_rows}".encode('utf-8')).hexdigest()
+    names = output_names(paths)
+
+    # Hash every input up front; unchanged inputs with their PDF still present are skipped
+    pending = {}
+    skipped = 0
+    for path in paths:
+        digest = file_digest(path, config.CHUNK_SIZE * 8)
+        name = names[path]
+        entry = manifest.get(name)
+        if (not args.force and entry and entry.get("sha256") == digest and entry.get("version") == version
+                and os.path.exists(os.path.join(args.output_dir, name))):
+            skipped += 1
+            continue
+        pending[path] = digest
+
+    start = time.perf_counter()
+    rendered = failed = receipts = 0
+    busy_seconds = 0.0
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(pending)))) as executor:
+            futures = {
+                executor.submit(render_workbook, config_name, path,
+                                os.path.join(args.output_dir, names[path]), args.format, args.max_rows): path
+                for path in pending
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                name = names[path]
+                try:
+                    report = future.result()
+                except Exception as e:
+                    report = {"receipts": 0, "rejected": 0, "error": str(e), "seconds": 0.0}
+                busy_seconds += report["seconds"]
+
+                if report["error"]:
+                    failed += 1
+                    manifest.pop(name, None)
+                    print(f"FAILED {path}: {report['error']}", file=sys.stderr)
+                else:
+                    rendered += 1
+                    receipts += report["receipts"]
+                    manifest[name] = {"input": path, "sha256": pending[path], "version": version,
+                                      "receipts": report["receipts"], "rejected": report["rejected"]}
+                    print(f"{name}: {report['receipts']} receipts"
+                          + (f", {report['rejected']} rows rejected" if report["rejected"] else "")
+                          + f" in {report['seconds']:.2f}s")
+                write_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{len(paths)} workbooks: {rendered} rendered, {skipped} up to date, {failed} failed")
+    if rendered:
+        print(f"{receipts} receipts in {elapsed:.2f}s ({receipts / elapsed:.1f} receipts/s, "
+              f"{rendered / elapsed:.2f} workbooks/s, {busy_seconds / (rendered + failed):.2f}s per workbook)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Render Service
+Local HTTP daemon that renders receipts to PDF (or a ZIP of per-receipt
+PDFs) with WeasyPrint in a process pool, so the Streamlit front-end never
+renders in its own script thread.
+
+Usage: python render_service.py [--host 127.0.0.1] [--port 8765] [--workers N]
+
+API (JSON unless noted):
+    POST   /jobs               {"receipts": [...], "output": "pdf"|"zip", "format": name} -> 202 {"job_id"}
+    GET    /jobs/<id>          {"status": "queued"|"running"|"done"|"failed", "done", "total"[, "error"]}
+    GET    /jobs/<id>/result   the rendered file (application/pdf or application/zip)
+    DELETE /jobs/<id>          drop the job and its result
+    GET    /health             "OK"
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Manager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config, get_config
+from template_registry import ReceiptFormat, get_template_registry
+from zip_stream import receipt_file_name, stream_zip
+
+logger = logging.getLogger(__name__)
+
+# Output kind -> (mimetype, download name)
+OUTPUTS = {
+    'pdf': ('application/pdf', 'receipts.pdf'),
+    'zip': ('application/zip', 'receipts.zip')
+}
+
+RECEIPT_KEYS = ('payee', 'amount', 'amount_words', 'work', 'row', 'sheet')
+
+def render_pdf(receipts: List, receipt_format: ReceiptFormat, batch_size: int,
+               on_progress: Optional[Callable[[int], None]] = None) -> bytes:
+    """Render receipts to one PDF, laying out a batch of receipts at a time.
+
+    Each batch is laid out and written to its own PDF before the next one
+    starts, so only one batch's HTML and layout are held at once; the batch
+    PDFs are then merged with pypdf.
+    """
+    from weasyprint import HTML
+
+    batch_pdfs = []
+    for start in range(0, len(receipts), batch_size):
+        batch = receipts[start:start + batch_size]
+        batch_pdfs.append(HTML(string=receipt_format.render(receipts=batch)).write_pdf())
+        if on_progress:
+            on_progress(start + len(batch))
+    if len(batch_pdfs) == 1:
+        return batch_pdfs[0]
+
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for batch_pdf in batch_pdfs:
+        writer.append(io.BytesIO(batch_pdf))
+    del batch_pdfs
+    merged = io.BytesIO()
+    writer.write(merged)
+    writer.close()
+    return merged.getvalue()
+
+def render_zip_entries(receipts: List, receipt_format: ReceiptFormat,
+                       on_progress: Optional[Callable[[int], None]] = None):
+    """Yield (file name, PDF bytes) for one PDF per receipt"""
+    from weasyprint import HTML
+
+    used_names = set()
+    for done, receipt in enumerate(receipts, start=1):
+        pdf_bytes = HTML(string=receipt_format.render(receipts=[receipt])).write_pdf()
+        yield receipt_file_name(receipt, used_names), pdf_bytes
+        if on_progress:
+            on_progress(done)
+
+def render_receipt_pdf(config_name: Optional[str], format_name: str, receipt: Dict) -> bytes:
+    """Render one receipt to its own PDF (runs inside a worker process)"""
+    from weasyprint import HTML
+
+    receipt_format = get_template_registry(get_config(config_name)).format(format_name)
+    return HTML(string=receipt_format.render(receipts=[receipt])).write_pdf()
+
+def run_job(config_name: Optional[str], job_id: str, receipts: List[Dict], output: str, format_name: str,
+            result_path: str, progress) -> int:
+    """Render one job (runs inside a worker process), writing the result to ``result_path``"""
+    config = get_config(config_name)
+    receipt_format = get_template_registry(config).format(format_name)
+
+    def report(done):
+        progress[job_id] = done
+
+    with open(result_path, 'wb') as result:
+        if output == 'pdf':
+            result.write(render_pdf(receipts, receipt_format, config.WEASYPRINT_BATCH_SIZE, report))
+        else:
+            for chunk in stream_zip(render_zip_entries(receipts, receipt_format, report)):
+                result.write(chunk)
+    return len(receipts)
+
+class RenderService:
+    """Render jobs run in a process pool; job state is kept in the server process.
+
+    Workers report progress through a Manager dict, so status requests never
+    wait on a render. Results are written to files under TEMP_DIR and
+    dropped after RENDER_SERVICE_JOB_TTL seconds or when the client deletes
+    the job.
+    """
+
+    def __init__(self, config: Config, config_name: Optional[str] = None, workers: Optional[int] = None):
+        self.config = config
+        self.config_name = config_name or os.environ.get('FLASK_ENV')
+        self.registry = get_template_registry(config)
+        self.directory = os.path.join(config.TEMP_DIR, 'render_service')
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.manager = Manager()
+        self.progress = self.manager.dict()
+        self.executor = ProcessPoolExecutor(max_workers=workers or config.RENDER_SERVICE_WORKERS)
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, payload) -> Tuple[Optional[str], str]:
+        """Validate a job request and queue it, returning (job_id, error)"""
+        receipts = payload.get('receipts') if isinstance(payload, dict) else None
+        output = payload.get('output', 'pdf') if isinstance(payload, dict) else None
+        format_name = (payload.get('format') if isinstance(payload, dict) else None) or self.config.HTML_RECEIPT_FORMAT
+        if (not isinstance(receipts, list) or not receipts or output not in OUTPUTS
+                or not all(isinstance(receipt, dict) for receipt in receipts)):
+            return None, self.config.ERROR_MESSAGES['invalid_render_job']
+        if len(receipts) > self.config.RENDER_SERVICE_MAX_RECEIPTS:
+            return None, self.config.ERROR_MESSAGES['too_many_rows'].format(
+                max_rows=self.config.RENDER_SERVICE_MAX_RECEIPTS)
+        if format_name not in self.registry.names():
+            return None, self.config.ERROR_MESSAGES['unknown_format'].format(
+                name=format_name, formats=', '.join(self.registry.names()))
+
+        self._expire_jobs()
+        receipts = [{key: receipt.get(key) for key in RECEIPT_KEYS} for receipt in receipts]
+        job_id = uuid.uuid4().hex
+        result_path = os.path.join(self.directory, f"{job_id}.{output}")
+        job = {"status": "queued", "total": len(receipts), "output": output,
+               "path": result_path, "created": time.time(), "error": None}
+        with self._lock:
+            self.jobs[job_id] = job
+        self.progress[job_id] = 0
+
+        future = self.executor.submit(run_job, self.config_name, job_id, receipts, output, format_name,
+                                      result_path, self.progress)
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        logger.info(f"Render job {job_id}: {len(receipts)} receipts as {output}")
+        return job_id, ""
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            done = self.progress.get(job_id, 0)
+            status = job["status"]
+            if status == "queued" and done:
+                status = "running"
+            report = {"job_id": job_id, "status": status, "done": done, "total": job["total"]}
+            if job["error"]:
+                report["error"] = job["error"]
+            return report
+
+    def result(self, job_id: str) -> Optional[Tuple[str, str, str]]:
+        """Return (path, mimetype, download name) of a finished job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "done":
+                return None
+            mimetype, download_name = OUTPUTS[job["output"]]
+            return job["path"], mimetype, download_name
+
+    def discard(self, job_id: str) -> bool:
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            return False
+        self.progress.pop(job_id, None)
+        self._remove(job["path"])
+        return True
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.manager.shutdown()
+
+    def _finish(self, job_id: str, future):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            error = future.exception()
+            if error is None:
+                job["status"] = "done"
+                self.progress[job_id] = job["total"]
+            else:
+                job["status"] = "failed"
+                job["error"] = str(error)
+                logger.error(f"Render job {job_id} failed: {str(error)}")
+
+    def _expire_jobs(self):
+        cutoff = time.time() - self.config.RENDER_SERVICE_JOB_TTL
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job["created"] < cutoff and job["status"] in ("done", "failed")]
+        for job_id in expired:
+            self.discard(job_id)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front for a RenderService (``self.server.service``)"""
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        service = self.server.service
+        if parts == ['health']:
+            return self._send(200, b"OK", 'text/plain')
+        if len(parts) == 2 and parts[0] == 'jobs':
+            status = service.status(parts[1])
+            return self._send_json(200, status) if status else self._not_found()
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result':
+            result = service.result(parts[1])
+            if result is None:
+                return self._not_found()
+            path, mimetype, download_name = result
+            return self._send_file(path, mimetype, download_name)
+        return self._not_found()
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self._not_found()
+        service = self.server.service
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'null')
+        except ValueError as e:
+            return self._send_json(400, {"error": service.config.ERROR_MESSAGES['invalid_json'].format(error=str(e))})
+        job_id, error_msg = service.submit(payload)
+        if job_id is None:
+            return self._send_json(400, {"error": error_msg})
+        return self._send_json(202, {"job_id": job_id})
+
+    def do_DELETE(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'jobs' and self.server.service.discard(parts[1]):
+            return self._send(204, b"", 'text/plain')
+        return self._not_found()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _not_found(self):
+        self._send_json(404, {"error": self.server.service.config.ERROR_MESSAGES['render_job_not_found']})
+
+    def _send_json(self, status: int, data: Dict):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: str, mimetype: str, download_name: str):
+        chunk_size = self.server.service.config.CHUNK_SIZE * 8
+        try:
+            size = os.path.getsize(path)
+            with open(path, 'rb') as f:
+                self.send_response(200)
+                self.send_header('Content-Type', mimetype)
+                self.send_header('Content-Length', str(size))
+                self.send_header('Content-Disposition', f'attachment; filename="{download_name}"')
+                self.end_headers()
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    self.wfile.write(chunk)
+        except OSError:
+            self._not_found()
+
+class RenderServiceError(Exception):
+    """The render service rejected a job or the job failed"""
+
+class RenderClient:
+    """Client for the render service, used by the Streamlit front-end"""
+
+    def __init__(self, config: Config, base_url: Optional[str] = None):
+        self.config = config
+        self.base_url = base_url or f"http://{config.RENDER_SERVICE_HOST}:{config.RENDER_SERVICE_PORT}"
+
+    def available(self) -> bool:
+        """Whether a render service is listening (checked quickly, so the caller can fall back)"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=0.5) as response:
+                return response.status == 200
+        except (OSError, urllib.error.URLError):
+            return False
+
+    def submit(self, receipts: List, output: str = 'pdf', format_name: Optional[str] = None) -> str:
+        payload = {
+            "receipts": [receipt.to_dict() if hasattr(receipt, 'to_dict') else dict(receipt) for receipt in receipts],
+            "output": output,
+            "format": format_name
+        }
+        return self._request('POST', '/jobs', json.dumps(payload).encode('utf-8'))["job_id"]
+
+    def status(self, job_id: str) -> Dict:
+        return self._request('GET', f'/jobs/{job_id}')
+
+    def result(self, job_id: str) -> bytes:
+        with self._open('GET', f'/jobs/{job_id}/result') as response:
+            return response.read()
+
+    def discard(self, job_id: str):
+        self._open('DELETE', f'/jobs/{job_id}').close()
+
+    def render(self, receipts: List, output: str = 'pdf', format_name: Optional[str] = None,
+               on_progress: Optional[Callable[[int, int], None]] = None, poll_interval: float = 0.25) -> bytes:
+        """Submit a job, report progress as (done, total) while it runs, and return the rendered file"""
+        job_id = self.submit(receipts, output, format_name)
+        deadline = time.time() + self.config.RENDER_SERVICE_TIMEOUT
+        try:
+            while True:
+                status = self.status(job_id)
+                if on_progress:
+                    on_progress(status["done"], status["total"])
+                if status["status"] == "done":
+                    return self.result(job_id)
+                if status["status"] == "failed":
+                    raise RenderServiceError(status.get("error") or self.config.ERROR_MESSAGES['pdf_error'])
+                if time.time() > deadline:
+                    raise RenderServiceError(self.config.ERROR_MESSAGES['render_timeout'])
+                time.sleep(poll_interval)
+        finally:
+            try:
+                self.discard(job_id)
+            except (OSError, urllib.error.URLError):
+                pass
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None) -> Dict:
+        with self._open(method, path, body) as response:
+            return json.loads(response.read())
+
+    def _open(self, method: str, path: str, body: Optional[bytes] = None):
+        request = urllib.request.Request(f"{self.base_url}{path}", data=body, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            return urllib.request.urlopen(request, timeout=self.config.RENDER_SERVICE_REQUEST_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read()).get("error")
+            except ValueError:
+                error = None
+            raise RenderServiceError(error or str(e))
+
+def main():
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Local receipt render service")
+    parser.add_argument('--host', default=config.RENDER_SERVICE_HOST, help="address to bind (keep it local)")
+    parser.add_argument('--port', type=int, default=config.RENDER_SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=config.RENDER_SERVICE_WORKERS, help="render processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = RenderService(config, workers=args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), RenderRequestHandler)
+    server.service = service
+    logger.info(f"Render service listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
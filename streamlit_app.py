@@ -1,11 +1,25 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-from jinja2 import Template
 from io import BytesIO
+import hashlib
 import tempfile
+import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from num2words import num2words
-from weasyprint import HTML
+
+from zip_stream import stream_zip, receipt_file_name
+from config import get_config
+from utils import ExcelProcessor
+from template_registry import get_template_registry
+from warmup import WarmUp
+from render_service import RenderClient, RenderServiceError
+from output_store import OutputStore, ResultStore
+import render_service
+
+logger = logging.getLogger(__name__)
 
 # Page configuration
 st.set_page_config(
@@ -18,195 +32,23 @@ st.set_page_config(
 # VERSION INDICATOR - If you see this version, the new code is deployed!
 APP_VERSION = "v3.0-BEAUTIFUL-2024-11-12"
 
-# Force cache clear on Streamlit Cloud
-import hashlib
-import time
-CACHE_BUSTER = hashlib.md5(str(time.time()).encode()).hexdigest()[:8]
-
-# Receipt template - EXACT format from emd-refund.html
-receipt_template = Template("""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta http-equiv="content-type" content="text/html; charset=UTF-8">
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=210mm, height=297mm">
-    <title>Hand Receipt (RPWA 28)</title>
-    <style>
-        body {
-            font-family: sans-serif;
-            margin: 0;
-        }
-
-        @page {
-            size: A4 portrait;
-            margin: 10mm;
-        }
-
-        .container {
-            width: 210mm;
-            height: 297mm;
-            margin: 0 auto;
-            border: 2px solid #ccc;
-            padding: 20px;
-            box-sizing: border-box;
-            position: relative;
-            page-break-after: always;
-        }
-
-        .header {
-            text-align: center;
-            margin-bottom: 2px;
-        }
-
-        .details {
-            margin-bottom: 1px;
-        }
-
-        .amount-words {
-            font-style: italic;
-        }
-
-        .signature-area {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-
-        .signature-area td, .signature-area th {
-            border: 1px solid #ccc;
-            padding: 5px;
-            text-align: left;
-        }
-
-        .offices {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }
-
-        .offices td, .offices th {
-            border: 1px solid black;
-            padding: 5px;
-            text-align: left;
-            word-wrap: break-word;
-        }
-
-        .input-field {
-            border-bottom: 1px dotted #ccc;
-            padding: 3px;
-            width: calc(100% - 10px);
-            display: inline-block;
-        }
-
-        .seal-container {
-            position: absolute;
-            left: 10mm;
-            bottom: 10mm;
-            width: 40mm;
-            height: 25mm;
-            z-index: 10;
-        }
-
-        .seal {
-            max-width: 100%;
-            max-height: 100%;
-            text-align: center;
-            line-height: 40mm;
-            color: blue;
-            display: flex;
-            justify-content: space-around;
-            align-items: center;
-        }
-
-        .bottom-left-box {
-            position: absolute;
-            bottom: 40mm;
-            left: 40mm;
-            border: 2px solid black;
-            padding: 10px;
-            width: 300px;
-            text-align: left;
-            height: auto;
-        }
-
-        .bottom-left-box p {
-            margin: 3px 0;
-        }
-
-        .bottom-left-box .blue-text {
-            color: blue;
-        }
-    </style>
-</head>
-<body>
-    {% for receipt in receipts %}
-    <div class="container">
-        <div class="header">
-            <h2>Payable to: - {{ receipt.payee }} ( Electric Contractor)</h2>
-            <h2>HAND RECEIPT (RPWA 28)</h2>
-            <p>(Referred to in PWF&A Rules 418,424,436 & 438)</p>
-            <p>Division - PWD Electric Division, Udaipur</p>
-        </div>
-        <div class="details">
-            <p>(1)Cash Book Voucher No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Date &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</p>
-            <p>(2)Cheque No. and Date &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</p>
-            <p>(3) Pay for ECS Rs.{{ receipt.amount }}/- (Rupees <span class="amount-words">{{ receipt.amount_words }} only</span>)</p>
-            <p>(4) Paid by me</p>
-            <p>(5) Received from The Executive Engineer PWD Electric Division, Udaipur the sum of Rs. {{ receipt.amount }}/- (Rupees <span class="amount-words">{{ receipt.amount_words }} only</span>)</p>
-            <p> Name of work for which payment is made: <span class="input-field">{{ receipt.work }}</span></p>
-            <p> Chargeable to Head:- 8443 [EMD-Refund] </p>   
-            <table class="signature-area">
-                <tr>
-                    <td>Witness</td>
-                    <td>Stamp</td>
-                    <td>Signature of payee</td>
-                </tr>
-                <tr>
-                    <td>Cash Book No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;Page No. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;</td>
-                    <td></td>
-                    <td></td>
-                </tr>
-            </table>
-            <table class="offices">
-                <tr>
-                    <td>For use in the Divisional Office</td>
-                    <td>For use in the Accountant General's office</td>
-                </tr>
-                <tr>
-                    <td>Checked</td>
-                    <td>Audited/Reviewed</td>
-                </tr>
-                <tr>
-                    <td>Accounts Clerk</td>
-                    <td>
-                        DA &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Auditor &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; Supdt. &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; G.O.
-                    </td>
-                </tr>
-            </table>
-        </div>
-        <div class="seal-container">
-            <div class="seal">
-                <p></p>
-                <p></p>
-                <p></p>
-            </div>
-        </div>
-        <div class="bottom-left-box">
-            <p class="blue-text"> Passed for Rs. {{ receipt.amount }}</p>
-            <p class="blue-text"> In Words Rupees: {{ receipt.amount_words }} Only</p>
-            <p class="blue-text"> Chargeable to Head:- 8443 [EMD-Refund]</p>
-            <div class="seal">
-                <p>Ar.</p>
-                <p>D.A.</p>
-                <p>E.E.</p>
-            </div>
-        </div>
-    </div>
-    {% endfor %}
-</body>
-</html>
-""")
+@st.cache_resource(show_spinner=False)
+def get_result_store():
+    """Generated files shared by every session, within a global memory budget"""
+    config = get_config()
+    return ResultStore(config, OutputStore(config))
+
+result_store = get_result_store()
+
+@st.cache_resource(show_spinner=False)
+def load_renderers():
+    """Receipt formats and the render service client, built once per server process"""
+    config = get_config()
+    registry = get_template_registry(config)
+    return registry.format('rpwa28-print'), registry.format(config.HTML_RECEIPT_FORMAT), RenderClient(config)
+
+# Receipt templates - shared WeasyPrint layout from templates/receipts/
+receipt_template, html_template, render_client = load_renderers()
 
 def convert_number_to_words(num):
     """Convert number to words in Indian format (Crore, Lakh, Thousand)"""
@@ -259,72 +101,189 @@ def convert_number_to_words(num):
     
     return words.strip()
 
-def find_column(df_columns, possible_names):
-    """Find column by matching possible names"""
-    for name in possible_names:
-        name_lower = name.lower()
-        for col in df_columns:
-            if name_lower in col.strip().lower():
-                return col
-    return None
+@st.cache_data(max_entries=32, show_spinner=False)
+def parse_upload(digest, name, _data):
+    """Parse an upload once per content hash through the same ExcelProcessor path as the Flask app.
+    
+    Returns a dict with the matched ``columns``, ``receipts``, ``rejected``
+    rows, whether rows past MAX_ROWS were ``truncated`` and an ``error``.
+    Reruns and repeated renders of the same file reuse the parsed receipts;
+    ``_data`` is excluded from the cache key, which is the SHA-256 ``digest``.
+    """
+    config = get_config()
+    processor = ExcelProcessor(config)
+    parsed = {"columns": None, "receipts": [], "rejected": [], "truncated": False, "error": ""}
+    
+    is_valid, error = processor.validate_file(None, name)
+    if not is_valid:
+        return {**parsed, "error": error}
+    
+    df, error = processor.read_excel(BytesIO(_data))
+    if df is None:
+        return {**parsed, "error": error}
+    parsed["truncated"] = df.attrs.get("truncated", False)
+    
+    payee_col, amount_col, work_col, error = processor.find_columns(df)
+    if error:
+        return {**parsed, "error": error}
+    parsed["columns"] = {"payee": payee_col, "amount": amount_col, "work": work_col}
+    
+    parsed["receipts"], parsed["rejected"] = processor.process_rows(df, payee_col, amount_col, work_col)
+    if not parsed["receipts"]:
+        parsed["error"] = config.ERROR_MESSAGES['no_valid_data']
+    return parsed
+
+def upload_bytes(file):
+    """Content of an upload (or any binary file object)"""
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+def upload_digest(file):
+    """SHA-256 of an upload's content, used as its identity across reruns"""
+    return hashlib.sha256(upload_bytes(file)).hexdigest()
+
+def read_receipts(file):
+    """Read receipts from an uploaded Excel, ODS or CSV/TSV file"""
+    data = upload_bytes(file)
+    parsed = parse_upload(hashlib.sha256(data).hexdigest(), os.path.basename(file.name), data)
+    if parsed["error"]:
+        return None, parsed["error"]
+    return parsed["receipts"], None
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_preview(digest, name, _data, count=3):
+    """First receipts of an upload as lightweight HTML, cached by the upload's hash.
+    
+    Returns (parsed upload, first receipts, HTML) so the column mapping and
+    rejected rows can be checked before the full PDF render.
+    """
+    parsed = parse_upload(digest, name, _data)
+    if parsed["error"]:
+        return parsed, [], None
+    
+    shown = parsed["receipts"][:count]
+    html = ''.join(html_template.generate(receipts=shown, print_ready=True))
+    return parsed, shown, html
+
+def render_pdf(receipts, batch_size=get_config().WEASYPRINT_BATCH_SIZE):
+    """Render receipts to one PDF in this process (see render_service.render_pdf)"""
+    return render_service.render_pdf(receipts, receipt_template, batch_size)
+
+def render_remote(receipts, output, progress):
+    """Render on the render service, or return None when it is not running.
+    
+    ``progress`` is called with (done, total) while the job runs, so the
+    page can show a progress bar instead of blocking its script thread.
+    """
+    if not render_client.available():
+        return None
+    try:
+        return render_client.render(receipts, output, receipt_template.name, on_progress=progress)
+    except (OSError, RenderServiceError) as e:
+        # Service went away, failed or timed out mid-job; render in process instead
+        logger.warning(f"Render service job failed, rendering in process: {str(e)}")
+        return None
 
-def process_excel_file(file):
+def process_excel_file(file, progress=None):
     """Process uploaded Excel file and generate PDF"""
     try:
-        # Reset file pointer to beginning (CRITICAL for avoiding cached data!)
-        file.seek(0)
+        receipts, error = read_receipts(file)
+        if error:
+            return None, error
         
-        # Read Excel file
-        df = pd.read_excel(file, nrows=50)
+        # Generate PDF
+        pdf_bytes = render_remote(receipts, 'pdf', progress)
+        if pdf_bytes is None:
+            pdf_bytes = render_pdf(receipts)
         
-        # Find required columns
-        payee_col = find_column(df.columns, ['Payee Name', 'PayeeName', 'Name', 'Contractor', 'Payee'])
-        amount_col = find_column(df.columns, ['Amount', 'Value', 'Cost', 'Payment', 'Total'])
-        work_col = find_column(df.columns, ['Work', 'Description', 'Item', 'Project', 'Job'])
+        return pdf_bytes, None
         
-        if not all([payee_col, amount_col, work_col]):
-            missing = []
-            if not payee_col: missing.append("Payee Name")
-            if not amount_col: missing.append("Amount")
-            if not work_col: missing.append("Work")
-            return None, f"Missing required columns: {', '.join(missing)}"
+    except Exception as e:
+        return None, f"Error processing file: {str(e)}"
+
+def process_excel_file_html(file, autoprint=False):
+    """Process uploaded Excel file into print-ready HTML, skipping PDF conversion"""
+    try:
+        receipts, error = read_receipts(file)
+        if error:
+            return None, error
         
-        # Process data
-        receipts = []
-        for _, row in df.iterrows():
-            try:
-                payee = str(row[payee_col]).strip()
-                amount = float(row[amount_col])
-                work = str(row[work_col]).strip()
-                
-                if payee and amount > 0 and work:
-                    receipts.append({
-                        "payee": payee,
-                        "amount": amount,
-                        "amount_words": convert_number_to_words(int(amount)),
-                        "work": work
-                    })
-            except (ValueError, TypeError):
-                continue
+        html = ''.join(html_template.generate(receipts=receipts, print_ready=True, autoprint=autoprint))
+        return html.encode('utf-8'), None
+        
+    except Exception as e:
+        return None, f"Error processing file: {str(e)}"
+
+@st.cache_resource(show_spinner=False)
+def get_render_pool():
+    """Worker processes for in-process ZIP renders when the render service is not running.
+    
+    WeasyPrint layout is pure Python and holds the GIL (and is not
+    guaranteed thread-safe), so receipts are laid out in processes.
+    """
+    return ProcessPoolExecutor(max_workers=get_config().RENDER_SERVICE_WORKERS)
+
+def process_excel_file_zip(file, progress=None):
+    """Process uploaded Excel file into a ZIP with one PDF per receipt.
+    
+    Uses the render service when it is running. Otherwise receipts are
+    rendered in a shared process pool and written to the archive in order.
+    The archive is spooled to a temporary file rather than memory; the
+    returned file object is positioned at the start.
+    """
+    try:
+        receipts, error = read_receipts(file)
+        if error:
+            return None, error
         
-        if not receipts:
-            return None, "No valid data found in the Excel file"
+        archive_bytes = render_remote(receipts, 'zip', progress)
+        if archive_bytes is not None:
+            return archive_bytes, None
         
-        # Generate HTML
-        rendered_html = receipt_template.render(receipts=receipts)
+        render = partial(render_service.render_receipt_pdf, None, receipt_template.name)
         
-        # Generate PDF
-        pdf_bytes = HTML(string=rendered_html).write_pdf()
+        def entries():
+            used_names = set()
+            rendered = get_render_pool().map(render, receipts)
+            for done, (receipt, pdf_bytes) in enumerate(zip(receipts, rendered), start=1):
+                yield receipt_file_name(receipt, used_names), pdf_bytes
+                if progress:
+                    progress(done, len(receipts))
         
-        return pdf_bytes, None
+        archive = tempfile.TemporaryFile()
+        for chunk in stream_zip(entries()):
+            archive.write(chunk)
+        archive.seek(0)
+        
+        return archive, None
         
     except Exception as e:
         return None, f"Error processing file: {str(e)}"
 
-# Custom CSS for beautiful styling - Inspired by BillGenerator (v2.1 - Cache Busted)
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    """Prime templates, the words converter and WeasyPrint once per server process.
+    
+    Streamlit has no start-up hook, so this runs in the background from the
+    first page load, while the user is still choosing a file.
+    """
+    config = get_config()
+    sample = [{"payee": "Warm-up Contractor", "amount": 12345.5,
+               "amount_words": convert_number_to_words(12345), "work": "Warm-up work"}]
+    warmup = WarmUp(config)
+    warmup.add_step("templates", get_template_registry(config).warm)
+    warmup.add_step("amount words", lambda: [convert_number_to_words(int(amount)) for amount in config.WARMUP_AMOUNTS])
+    warmup.add_step("weasyprint", lambda: render_pdf(sample))
+    warmup.start()
+    return warmup
+
+start_warmup()
+
+# Custom CSS for beautiful styling - Inspired by BillGenerator (v2.1)
 st.markdown("""
 <style>
-    /* Cache Buster: FORCED REFRESH */
     /* Green Header Styling */
     .main-header {
         background: linear-gradient(135deg, #2ecc71 0%, #27ae60 100%);
@@ -542,7 +501,7 @@ st.markdown("""
 <div class='info-box'>
     <h3>📋 How to Use</h3>
     <ul>
-        <li><strong>Step 1:</strong> Prepare your Excel file (.xlsx) with required columns</li>
+        <li><strong>Step 1:</strong> Prepare your Excel file (.xlsx, .ods, .csv or .tsv) with required columns</li>
         <li><strong>Step 2:</strong> Upload the file using the button below</li>
         <li><strong>Step 3:</strong> Click Generate PDF and download your receipts</li>
     </ul>
@@ -562,113 +521,200 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Download name and mimetype of each output mode, and the download button label for each mimetype
+RESULT_DOWNLOADS = {
+    "One combined PDF": ("hand_receipts.pdf", "application/pdf"),
+    "ZIP with one PDF per payee": ("hand_receipts.zip", "application/zip"),
+    "Print-ready HTML (no PDF)": ("hand_receipts.html", "text/html")
+}
+DOWNLOAD_LABELS = {
+    "application/pdf": "📥 Download PDF",
+    "application/zip": "📥 Download ZIP",
+    "text/html": "📥 Download printable HTML"
+}
+
 # Initialize session state for file tracking
 if 'last_file_name' not in st.session_state:
     st.session_state.last_file_name = None
 if 'last_file_id' not in st.session_state:
     st.session_state.last_file_id = None
 
-# File uploader with unique key to prevent caching issues
-st.markdown("<br>", unsafe_allow_html=True)
-uploaded_file = st.file_uploader(
-    "📁 Choose your Excel file",
-    type=['xlsx'],
-    help="Upload .xlsx file (max 10MB, 50 rows)",
-    key="excel_uploader"
-)
-
-if uploaded_file is not None:
-    # Generate unique file ID based on name and size
-    current_file_id = f"{uploaded_file.name}_{uploaded_file.size}"
-    
-    # Check if this is a NEW file (different from last upload)
-    if current_file_id != st.session_state.last_file_id:
-        st.session_state.last_file_id = current_file_id
-        st.session_state.last_file_name = uploaded_file.name
-        # Clear any cached data
-        if 'pdf_bytes' in st.session_state:
-            del st.session_state.pdf_bytes
-    # Show file details with nice styling and celebration
-    file_status = "🆕 NEW FILE" if current_file_id != st.session_state.get('last_processed_id') else "✅ READY"
-    
-    st.markdown(f"""
-    <div style='background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); 
-                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                border-left: 5px solid #2196f3; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-        <p style='margin: 0; color: #1976d2; font-size: 1.1rem;'>
-            <span class='celebrate' style='display: inline-block;'>🎉</span>
-            <strong>📁 File:</strong> {uploaded_file.name} 
-            <strong>📊 Size:</strong> {uploaded_file.size / 1024:.2f} KB
-            <strong>🔖 Status:</strong> {file_status}
-            <span class='celebrate' style='display: inline-block;'>🎉</span>
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Mini celebration only for NEW files
-    if current_file_id != st.session_state.get('last_processed_id'):
-        st.balloons()
-    
-    # Process button with columns for better layout
-    col1, col2 = st.columns([3, 1])
-    
-    with col1:
-        process_button = st.button("🚀 Generate PDF", type="primary", use_container_width=True)
-    
-    with col2:
-        if st.button("🗑️ Clear", use_container_width=True):
-            # Clear session state
-            st.session_state.last_file_id = None
-            st.session_state.last_file_name = None
-            if 'pdf_bytes' in st.session_state:
-                del st.session_state.pdf_bytes
-            st.rerun()
-    
-    if process_button:
-        with st.spinner("✨ Processing your file and generating beautiful PDFs..."):
-            # Always read fresh data from the uploaded file
-            uploaded_file.seek(0)  # Reset to beginning
-            pdf_bytes, error = process_excel_file(uploaded_file)
-            
-            if error:
-                st.error(f"❌ {error}")
+@st.fragment
+def receipt_workspace():
+    """Upload, preview and result area.
+    
+    Runs as a fragment: choosing an output or clicking Generate reruns only
+    this part of the page, not the header, styles and instructions above.
+    """
+    # File uploader with unique key to prevent caching issues
+    st.markdown("<br>", unsafe_allow_html=True)
+    uploaded_file = st.file_uploader(
+        "📁 Choose your Excel file",
+        type=['xlsx', 'ods', 'csv', 'tsv'],
+        help="Upload .xlsx, .ods, .csv or .tsv file (max 10MB, 50 rows)",
+        key="excel_uploader"
+    )
+
+    if uploaded_file is not None:
+        # Identify the file by its content, so a changed file with the same name and size is re-read
+        current_file_id = upload_digest(uploaded_file)
+    
+        # Check if this is a NEW file (different from last upload)
+        if current_file_id != st.session_state.last_file_id:
+            st.session_state.last_file_id = current_file_id
+            st.session_state.last_file_name = uploaded_file.name
+            # Clear any cached data
+            if 'result' in st.session_state:
+                del st.session_state.result
+        # Show file details with nice styling and celebration
+        file_status = "🆕 NEW FILE" if current_file_id != st.session_state.get('last_processed_id') else "✅ READY"
+    
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%); 
+                    padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
+                    border-left: 5px solid #2196f3; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+            <p style='margin: 0; color: #1976d2; font-size: 1.1rem;'>
+                <span class='celebrate' style='display: inline-block;'>🎉</span>
+                <strong>📁 File:</strong> {uploaded_file.name} 
+                <strong>📊 Size:</strong> {uploaded_file.size / 1024:.2f} KB
+                <strong>🔖 Status:</strong> {file_status}
+                <span class='celebrate' style='display: inline-block;'>🎉</span>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+        # Mini celebration only for NEW files
+        if current_file_id != st.session_state.get('last_processed_id'):
+            st.balloons()
+    
+        # Check the detected columns on the first receipts before the full render
+        parsed, shown, preview_html = build_preview(
+            current_file_id, uploaded_file.name, uploaded_file.getvalue(), get_config().PREVIEW_RECEIPTS
+        )
+        if parsed["rejected"]:
+            st.warning(f"⚠️ {len(parsed['rejected'])} rows failed validation and will be skipped (see the preview)")
+        if parsed["truncated"]:
+            st.warning(f"⚠️ Only the first {get_config().MAX_ROWS} rows of the sheet are used")
+        with st.expander("🔍 Preview the first receipts"):
+            if parsed["error"]:
+                st.error(f"❌ {parsed['error']}")
             else:
-                # Store the processed file ID
-                st.session_state.last_processed_id = current_file_id
+                columns = parsed["columns"]
+                st.markdown(
+                    f"**Payee:** `{columns['payee']}` &nbsp; **Amount:** `{columns['amount']}` &nbsp; "
+                    f"**Work:** `{columns['work']}` &nbsp; ({len(parsed['receipts'])} receipts found)"
+                )
+                st.dataframe(pd.DataFrame([receipt.to_dict() for receipt in shown]), hide_index=True,
+                             use_container_width=True)
+                if parsed["rejected"]:
+                    st.markdown("**Rejected rows**")
+                    st.dataframe(pd.DataFrame(parsed["rejected"]), hide_index=True, use_container_width=True)
+                components.html(preview_html, height=600, scrolling=True)
+    
+        # Output mode
+        output_mode = st.radio(
+            "📦 Output",
+            list(RESULT_DOWNLOADS),
+            horizontal=True,
+            key="output_mode"
+        )
+        zip_output = output_mode.startswith("ZIP")
+        html_output = output_mode.startswith("Print-ready")
+        autoprint = html_output and st.checkbox("Open the print dialog when the file is opened", key="autoprint")
+    
+        # Process button with columns for better layout
+        col1, col2 = st.columns([3, 1])
+    
+        with col1:
+            process_button = st.button("🚀 Generate PDF", type="primary", use_container_width=True)
+    
+        with col2:
+            if st.button("🗑️ Clear", use_container_width=True):
+                # Clear session state
+                st.session_state.last_file_id = None
+                st.session_state.last_file_name = None
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                st.rerun()
+    
+        if process_button:
+            with st.spinner("✨ Processing your file and generating beautiful PDFs..."):
+                # Filled in by the render service as receipts are rendered
+                progress_bar = st.empty()
+            
+                def show_progress(done, total):
+                    progress_bar.progress(done / total if total else 0.0, text=f"Rendered {done} of {total} receipts")
+            
+                # Always read fresh data from the uploaded file
+                uploaded_file.seek(0)  # Reset to beginning
+                if zip_output:
+                    output_data, error = process_excel_file_zip(uploaded_file, progress=show_progress)
+                elif html_output:
+                    output_data, error = process_excel_file_html(uploaded_file, autoprint)
+                else:
+                    output_data, error = process_excel_file(uploaded_file, progress=show_progress)
+                progress_bar.empty()
+            
+                if error:
+                    st.error(f"❌ {error}")
+                else:
+                    # Store the processed file ID
+                    st.session_state.last_processed_id = current_file_id
                 
-                # BIG CELEBRATION!
-                st.success("✅ PDF generated successfully!")
-                st.balloons()
+                    # BIG CELEBRATION!
+                    st.success("✅ PDF generated successfully!")
+                    st.balloons()
                 
-                # Celebration message
-                st.markdown("""
-                <div style='text-align: center; padding: 1rem; background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%); 
-                            border-radius: 15px; margin: 1rem 0; border: 2px solid #28a745;'>
-                    <p style='margin: 0; font-size: 1.5rem;'>
-                        <span class='celebrate' style='display: inline-block;'>🎊</span>
-                        <span class='celebrate' style='display: inline-block;'>🎉</span>
-                        <span class='celebrate' style='display: inline-block;'>🎈</span>
-                        <strong style='color: #155724;'>SUCCESS!</strong>
-                        <span class='celebrate' style='display: inline-block;'>🎈</span>
-                        <span class='celebrate' style='display: inline-block;'>🎉</span>
-                        <span class='celebrate' style='display: inline-block;'>🎊</span>
-                    </p>
-                    <p style='margin: 0.5rem 0 0 0; color: #155724; font-size: 1.1rem;'>
-                        Your receipts are ready to download!
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
+                    # Celebration message
+                    st.markdown("""
+                    <div style='text-align: center; padding: 1rem; background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%); 
+                                border-radius: 15px; margin: 1rem 0; border: 2px solid #28a745;'>
+                        <p style='margin: 0; font-size: 1.5rem;'>
+                            <span class='celebrate' style='display: inline-block;'>🎊</span>
+                            <span class='celebrate' style='display: inline-block;'>🎉</span>
+                            <span class='celebrate' style='display: inline-block;'>🎈</span>
+                            <strong style='color: #155724;'>SUCCESS!</strong>
+                            <span class='celebrate' style='display: inline-block;'>🎈</span>
+                            <span class='celebrate' style='display: inline-block;'>🎉</span>
+                            <span class='celebrate' style='display: inline-block;'>🎊</span>
+                        </p>
+                        <p style='margin: 0.5rem 0 0 0; color: #155724; font-size: 1.1rem;'>
+                            Your receipts are ready to download!
+                        </p>
+                    </div>
+                    """, unsafe_allow_html=True)
                 
-                # Download button with celebration
-                st.download_button(
-                    label="📥 Download PDF",
-                    data=pdf_bytes,
-                    file_name="hand_receipts.pdf",
-                    mime="application/pdf"
-                )
+                    # More balloons!
+                    st.balloons()
                 
-                # More balloons!
-                st.balloons()
+                    # Keep the result in the shared store; the session only holds its handle
+                    if hasattr(output_data, 'read'):
+                        with output_data:
+                            output_data = output_data.read()
+                    download_name, mimetype = RESULT_DOWNLOADS[output_mode]
+                    handle = result_store.put(output_data, download_name, mimetype)
+                    if handle is None:
+                        # Too large to keep; offer it for this run only
+                        st.warning("⚠️ This result is too large to keep; download it now, it is gone after the next action")
+                        st.download_button(label=DOWNLOAD_LABELS[mimetype], data=output_data,
+                                           file_name=download_name, mime=mimetype)
+                    st.session_state.result = {"handle": handle, "file_id": current_file_id}
+        
+        # Download button for the last result of this file (kept across reruns)
+        result = st.session_state.get('result')
+        stored = (result and result["handle"] and result["file_id"] == current_file_id
+                  and result_store.get(result["handle"]))
+        if stored:
+            st.download_button(
+                label=DOWNLOAD_LABELS[stored["mimetype"]],
+                data=stored["data"],
+                file_name=stored["download_name"],
+                mime=stored["mimetype"]
+            )
+            if stored["mimetype"] == "text/html":
+                st.caption("Open the file in your browser and print it; each receipt prints on its own A4 sheet.")
+
+receipt_workspace()
 
 st.markdown("</div>", unsafe_allow_html=True)
 
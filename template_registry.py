@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, meta, select_autoescape
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Receipt fields a fragment template may use; the fragment cache is keyed on these
+FRAGMENT_FIELDS = ('payee', 'amount', 'amount_words', 'work')
+
+def receipt_digest(receipt) -> str:
+    """Content digest of a receipt (a Receipt or dict), over FRAGMENT_FIELDS"""
+    values = tuple(receipt.get(field) for field in FRAGMENT_FIELDS)
+    return hashlib.sha256(repr(values).encode('utf-8')).hexdigest()
+
+class FragmentCache:
+    """Thread-safe LRU of rendered receipt fragments, keyed by (template version, receipt digest)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, key, fragment: str):
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+
+    def cache_info(self) -> Dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._fragments),
+                    'max_entries': self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.hits = self.misses = 0
+
+class ReceiptFormat:
+    """One named receipt format from the registry.
+
+    The template is looked up on every render rather than held, so the
+    environment's mtime check picks up edited template files.
+
+    Formats with a ``fragment`` template are assembled from the document
+    shell (the ``document_start``/``document_end`` blocks of the main
+    template) and one fragment per receipt. Fragments come from the
+    registry's FragmentCache, so a receipt seen before with the same
+    fields and template version is not rendered again.
+    """
+
+    def __init__(self, registry: 'TemplateRegistry', name: str, spec: Dict):
+        self.registry = registry
+        self.environment = registry.environment
+        self.name = name
+        self.template_name = spec['template']
+        self.fragment_name = spec.get('fragment')
+        self.context = spec.get('context', {})
+
+    @property
+    def template(self) -> Template:
+        return self.environment.get_template(self.template_name)
+
+    def render(self, **context) -> str:
+        return ''.join(self.generate(**context))
+
+    def generate(self, **context) -> Iterator[str]:
+        """Render lazily, yielding the document in chunks as it is produced"""
+        context = {**self.context, **context}
+        template = self.template
+        if self.fragment_name is None:
+            yield from template.generate(**context)
+            return
+
+        receipts = context.pop('receipts')
+        shell = template.new_context(context)
+        yield from template.blocks['document_start'](shell)
+        for fragment in self.fragments(receipts, **context):
+            yield '\n'
+            yield fragment
+        yield '\n'
+        yield from template.blocks['document_end'](shell)
+
+    def fragments(self, receipts, **context) -> Iterator[str]:
+        """Rendered fragment of each receipt, from the fragment cache where possible"""
+        fragment_template = self.environment.get_template(self.fragment_name)
+        context = {**self.context, **context}
+        version = self.version(context)
+        cache = self.registry.fragment_cache
+
+        for receipt in receipts:
+            key = (version, receipt_digest(receipt))
+            fragment = cache.get(key)
+            if fragment is None:
+                fragment = fragment_template.render(**context, receipt=receipt)
+                cache.put(key, fragment)
+            yield fragment
+
+    def version(self, context: Dict) -> str:
+        """Digest of the format's templates, the templates they include and the render context"""
+        digest = hashlib.sha256(repr(sorted(context.items())).encode('utf-8'))
+        # Only plain-value globals (e.g. division); Jinja's built-in helpers would make the digest per-process
+        values = {key: value for key, value in self.environment.globals.items()
+                  if isinstance(value, (str, int, float, bool))}
+        digest.update(repr(sorted(values.items())).encode('utf-8'))
+        pending, seen = [self.template_name] + ([self.fragment_name] if self.fragment_name else []), set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            source_digest, references = self.registry.source_digest(name)
+            digest.update(name.encode('utf-8') + b'\0' + source_digest.encode('utf-8'))
+            pending.extend(references)
+        return digest.hexdigest()
+
+class TemplateRegistry:
+    """Receipt formats loaded from ``templates/`` through a single Jinja Environment.
+
+    Compiled templates are cached in memory by the environment and as
+    bytecode on disk, so every entry point and worker process renders from
+    the same compiled artifact instead of compiling its own inline copy.
+    Formats are configured in ``RECEIPT_FORMATS``: a template file, an
+    optional per-receipt fragment template, and context defaults.
+    """
+
+    def __init__(self, config: Config, template_dir: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.config = config
+        self.formats = config.RECEIPT_FORMATS
+        self.default_format = config.DEFAULT_RECEIPT_FORMAT
+        self.fragment_cache = FragmentCache(config.RECEIPT_FRAGMENT_CACHE_SIZE)
+
+        cache_dir = cache_dir or os.path.join(config.TEMP_DIR, 'receipt_template_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.environment = Environment(
+            loader=FileSystemLoader(template_dir or config.TEMPLATE_DIR),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            auto_reload=config.TEMPLATE_AUTO_RELOAD,
+            autoescape=select_autoescape(['html']),
+            # Keep every compiled format in memory
+            cache_size=-1
+        )
+        self.environment.globals['division'] = config.RECEIPT_DIVISION
+        self._source_digests = {}
+        self._source_lock = threading.Lock()
+
+    def source_digest(self, name: str) -> Tuple[str, List[str]]:
+        """Digest of a template file's source and the templates it references.
+
+        Memoised per template, so a render does not re-read and re-parse its
+        templates; an entry is refreshed when the loader's ``uptodate`` check
+        (the file's mtime) says the file changed, and only then with
+        auto-reload on.
+        """
+        with self._source_lock:
+            cached = self._source_digests.get(name)
+        if cached is not None:
+            digest, references, uptodate = cached
+            if not self.environment.auto_reload or uptodate is None or uptodate():
+                return digest, references
+
+        source, _, uptodate = self.environment.loader.get_source(self.environment, name)
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        references = [ref for ref in meta.find_referenced_templates(self.environment.parse(source)) if ref]
+        with self._source_lock:
+            self._source_digests[name] = (digest, references, uptodate)
+        return digest, references
+
+    def names(self) -> List[str]:
+        return list(self.formats)
+
+    def format(self, name: Optional[str] = None) -> ReceiptFormat:
+        """Return a receipt format by name (the configured default when None)"""
+        name = name or self.default_format
+        if name not in self.formats:
+            raise ValueError(self.config.ERROR_MESSAGES['unknown_format'].format(
+                name=name, formats=', '.join(self.formats)))
+        return ReceiptFormat(self, name, self.formats[name])
+
+    def render(self, receipts: List, name: Optional[str] = None, **context) -> str:
+        """Render receipts with a named format"""
+        return self.format(name).render(receipts=receipts, **context)
+
+    def warm(self):
+        """Compile every format up front (loading bytecode from disk when cached)"""
+        for name in self.formats:
+            receipt_format = self.format(name)
+            receipt_format.template
+            if receipt_format.fragment_name:
+                self.environment.get_template(receipt_format.fragment_name)
+        logger.info(f"Loaded receipt formats: {', '.join(self.formats)}")
+
+@lru_cache(maxsize=None)
+def get_template_registry(config: Type[Config]) -> TemplateRegistry:
+    """Shared registry per configuration, so one process keeps one Environment"""
+    return TemplateRegistry(config)
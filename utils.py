@@ -1,40 +1,205 @@
+import numpy as np
 import pandas as pd
+import io
 import logging
-from typing import List, Dict, Optional, Tuple
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zipfile
+from typing import List, Dict, Iterable, Optional, Tuple, Sequence, Union
 from functools import lru_cache
 from num2words import num2words
 from config import Config
+from workbook_inspector import WorkbookInspector
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ('payee', 'amount', 'work')
+
+# An amount as typed in ledgers, e.g. "Rs. 1,23,456.50", "₹ 5000/-" or "12,000.00 ": optional
+# currency marker and "/-" suffix around plain digits or digits grouped the Indian
+# (1,23,456) or international (123,456) way
+_CURRENCY = r'(?:₹|rs\.?|inr)'
+_AMOUNT_PATTERN = re.compile(
+    rf'^\s*{_CURRENCY}?\s*'
+    r'(-?(?:\d+|\d{1,3}(?:,\d{3})+|\d{1,2}(?:,\d{2})+,\d{3})(?:\.\d+)?(?:e[-+]?\d+)?)'
+    rf'\s*{_CURRENCY}?\s*(?:/-|/=)?\s*$',
+    re.IGNORECASE
+)
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """Normalise a column of amount cells to floats in one pass; NaN where unparseable.
+    
+    Numbers and plain numeric text convert directly. The remaining text
+    cells are matched against _AMOUNT_PATTERN in a single vectorised
+    extract, so currency markers, digit grouping and "/-" are handled
+    without a per-cell try/except.
+    """
+    values = pd.Series(values, dtype=object)
+    types = values.map(type)
+    amounts = pd.to_numeric(values, errors='coerce').astype(float)
+    # bool is an int subclass, but a JSON true or a TRUE cell is no amount
+    amounts = amounts.mask(types.map(lambda t: issubclass(t, (bool, np.bool_))))
+    
+    dirty = amounts.isna() & (types == str)
+    if dirty.any():
+        numbers = values[dirty].astype(str).str.extract(_AMOUNT_PATTERN, expand=False)
+        amounts[dirty] = pd.to_numeric(numbers.str.replace(',', '', regex=False), errors='coerce')
+    
+    # "inf" parses as a number but is no amount
+    return amounts.mask(amounts.abs() == float('inf'))
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, float) and pd.isna(value)) or (isinstance(value, str) and not value.strip())
+
+class Receipt:
+    """One validated receipt, as rendered into the templates.
+    
+    A slotted record instead of a dict, with the payee, work and amount
+    strings interned: in large ledgers the same names and descriptions
+    repeat hundreds of times and are stored once. Dict-style access
+    (``receipt["payee"]``, ``get``, ``in``) is kept for existing callers;
+    the optional ``row`` and ``sheet`` count as absent while unset.
+    """
+    
+    __slots__ = ('payee', 'amount', 'amount_words', 'work', 'row', 'sheet')
+    
+    def __init__(self, payee: str, amount: str, amount_words: str, work: str,
+                 row: Optional[int] = None, sheet: Optional[str] = None):
+        self.payee = sys.intern(payee)
+        self.amount = sys.intern(amount)
+        self.amount_words = amount_words
+        self.work = sys.intern(work)
+        self.row = row
+        self.sheet = sheet
+    
+    def __getitem__(self, key: str):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+    
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+    
+    def keys(self) -> List[str]:
+        return [key for key in self.__slots__ if getattr(self, key) is not None]
+    
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.keys()}
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Receipt, dict)):
+            return self.to_dict() == dict(other.to_dict() if isinstance(other, Receipt) else other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"Receipt({self.to_dict()!r})"
+
+class ColumnResolver:
+    """Precompiled alias index mapping header names to payee/amount/work.
+    
+    Matching follows the configured alias order: the first alias found as a
+    substring of any header wins, and among headers matching the same alias
+    the leftmost wins. One compiled alternation per field rejects
+    non-matching headers before aliases are ranked.
+    """
+    
+    def __init__(self, supported_columns: Dict[str, List[str]]):
+        self.fields = tuple(supported_columns)
+        self._aliases = {
+            field: tuple(alias.lower() for alias in aliases)
+            for field, aliases in supported_columns.items()
+        }
+        self._patterns = {
+            field: re.compile('|'.join(re.escape(alias) for alias in aliases))
+            for field, aliases in self._aliases.items()
+        }
+    
+    def resolve(self, headers: Sequence) -> Dict[str, Optional[int]]:
+        """Return the position of the best matching header for each field"""
+        normalized = [str(header).strip().lower() if header is not None else '' for header in headers]
+        positions = {}
+        
+        for field in self.fields:
+            pattern = self._patterns[field]
+            aliases = self._aliases[field]
+            best = None
+            for position, header in enumerate(normalized):
+                if not pattern.search(header):
+                    continue
+                rank = next(i for i, alias in enumerate(aliases) if alias in header)
+                if best is None or rank < best[0]:
+                    best = (rank, position)
+                    if rank == 0:
+                        break
+            positions[field] = best[1] if best else None
+        
+        return positions
+
 class ExcelProcessor:
     """Handles Excel file processing with optimized performance"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, max_rows: Optional[int] = None):
         self.config = config
         self.supported_columns = config.SUPPORTED_COLUMNS
-        self.max_rows = config.MAX_ROWS
+        # Data rows read per sheet; 0 reads every row
+        self.max_rows = config.MAX_ROWS if max_rows is None else max_rows
+        self.header_scan_rows = config.HEADER_SCAN_ROWS
+        self.excel_engine = config.EXCEL_ENGINE
+        self.inspector = WorkbookInspector(config)
+        self.column_resolver = ColumnResolver(config.SUPPORTED_COLUMNS)
     
     def validate_file(self, file_stream, filename: str) -> Tuple[bool, str]:
         """Validate uploaded file"""
         if not filename or filename == '':
             return False, self.config.ERROR_MESSAGES['no_file']
         
-        if not filename.lower().endswith('.xlsx'):
+        if os.path.splitext(filename.lower())[1] not in self.config.ALLOWED_EXTENSIONS:
             return False, self.config.ERROR_MESSAGES['invalid_extension']
         
         return True, ""
     
     def read_excel(self, file_stream) -> Tuple[Optional[pd.DataFrame], str]:
-        """Read Excel file with optimized settings"""
+        """Read the payee, amount and work columns of the first sheet.
+        
+        Accepts .xlsx, .ods and CSV/TSV content; all go through the same
+        header sniffing and column projection.
+        
+        Phase one scans the first HEADER_SCAN_ROWS rows for a header row
+        that resolves all three columns (it need not be row 1). Phase two
+        reads only the span of those columns for up to MAX_ROWS data rows,
+        so wide ledgers do not pay for columns that are thrown away.
+        """
+        # Refuse decompression bombs and oversized sheets before the parser allocates
+        file_format = self.detect_format(file_stream)
+        if file_format != 'delimited':
+            is_safe, error_msg = self.inspector.inspect(file_stream)
+            if not is_safe:
+                return None, error_msg
+        
         try:
-            df = pd.read_excel(
-                file_stream,
-                engine='openpyxl',
-                nrows=self.max_rows,
-                na_values=['', 'nan', 'None'],
-                keep_default_na=False
-            )
+            workbook = self._open_workbook(file_stream, file_format)
+            try:
+                worksheet = workbook.worksheets[0]
+                
+                header, error_msg = self.read_header(worksheet)
+                if header is None:
+                    return None, error_msg
+                
+                df = self._read_columns(worksheet, header)
+            finally:
+                workbook.close()
             
             if df.empty:
                 return None, self.config.ERROR_MESSAGES['empty_file']
@@ -45,76 +210,290 @@ class ExcelProcessor:
             logger.error(f"Error reading Excel file: {str(e)}")
             return None, f"Error reading file: {str(e)}"
     
+    def read_excel_sheets(self, file_stream) -> Tuple[List[Tuple[str, pd.DataFrame]], str]:
+        """Read every sheet whose header resolves payee, amount and work.
+        
+        The workbook is loaded once; each sheet costs only a header scan plus
+        the projected column read, instead of a full workbook load per sheet.
+        Returns (sheet name, dataframe) pairs in workbook order.
+        """
+        file_format = self.detect_format(file_stream)
+        if file_format != 'delimited':
+            is_safe, error_msg = self.inspector.inspect(file_stream)
+            if not is_safe:
+                return [], error_msg
+        
+        try:
+            workbook = self._open_workbook(file_stream, file_format)
+            sheets = []
+            first_error = ""
+            try:
+                for worksheet in workbook.worksheets:
+                    header, error_msg = self.read_header(worksheet)
+                    if header is None:
+                        first_error = first_error or f"{worksheet.title}: {error_msg}"
+                        continue
+                    df = self._read_columns(worksheet, header)
+                    if not df.empty:
+                        df.attrs["sheet"] = worksheet.title
+                        sheets.append((worksheet.title, df))
+            finally:
+                workbook.close()
+            
+            if not sheets:
+                return [], first_error or self.config.ERROR_MESSAGES['empty_file']
+            
+            return sheets, ""
+            
+        except Exception as e:
+            logger.error(f"Error reading Excel file: {str(e)}")
+            return [], f"Error reading file: {str(e)}"
+    
+    @staticmethod
+    def detect_format(file_stream) -> str:
+        """Tell 'xlsx', 'ods' and 'delimited' (CSV/TSV) uploads apart by their content"""
+        file_stream.seek(0)
+        is_zip = file_stream.read(4) == b'PK\x03\x04'
+        file_stream.seek(0)
+        if not is_zip:
+            return 'delimited'
+        
+        try:
+            with zipfile.ZipFile(file_stream) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return 'xlsx'
+        finally:
+            file_stream.seek(0)
+        return 'ods' if 'content.xml' in names and 'xl/workbook.xml' not in names else 'xlsx'
+    
+    def _open_workbook(self, file_stream, file_format: str = 'xlsx'):
+        """Open a workbook read-only; .xlsx files use the configured EXCEL_ENGINE"""
+        if file_format == 'delimited':
+            from delimited_reader import DelimitedWorkbook
+            return DelimitedWorkbook(
+                file_stream, self.config.CSV_FALLBACK_ENCODING, self.config.CSV_SNIFF_BYTES
+            )
+        if file_format == 'ods':
+            from ods_reader import ODSWorkbook
+            return ODSWorkbook(file_stream, self.config.MAX_SHEET_ROWS, self.config.MAX_SHEET_COLUMNS)
+        
+        if self.excel_engine == 'ooxml':
+            from ooxml_reader import OOXMLWorkbook
+            return OOXMLWorkbook(file_stream)
+        
+        from openpyxl import load_workbook
+        return load_workbook(file_stream, read_only=True, data_only=True)
+    
+    def read_header(self, worksheet) -> Tuple[Optional[Dict], str]:
+        """Find the header row and the positions of the required columns"""
+        first_headers = None
+        
+        for row_number, values in enumerate(
+            worksheet.iter_rows(max_row=self.header_scan_rows, values_only=True), start=1
+        ):
+            if not any(value is not None and str(value).strip() for value in values):
+                continue
+            if first_headers is None:
+                first_headers = values
+            
+            positions = self.column_resolver.resolve(values)
+            if all(positions[field] is not None for field in REQUIRED_FIELDS):
+                return {
+                    "row": row_number,
+                    "positions": positions,
+                    "names": self._header_names(values)
+                }, ""
+        
+        if first_headers is None:
+            return None, self.config.ERROR_MESSAGES['empty_file']
+        
+        return None, self._missing_columns_error(self._header_names(first_headers))
+    
+    def _read_columns(self, worksheet, header: Dict) -> pd.DataFrame:
+        """Read just the resolved columns below the header row.
+        
+        One row past ``max_rows`` is read so that a cut-off sheet can be
+        told apart from one that ends exactly at the limit; the dataframe's
+        ``truncated`` attribute is set when rows were left unread.
+        """
+        columns = sorted(set(header["positions"][field] for field in REQUIRED_FIELDS))
+        first_col, last_col = columns[0], columns[-1]
+        values = {position: [] for position in columns}
+        
+        for row in worksheet.iter_rows(
+            min_row=header["row"] + 1,
+            max_row=header["row"] + self.max_rows + 1 if self.max_rows else None,
+            min_col=first_col + 1,
+            max_col=last_col + 1,
+            values_only=True
+        ):
+            for position in columns:
+                offset = position - first_col
+                value = row[offset] if offset < len(row) else None
+                if isinstance(value, str) and value.strip() in ('', 'nan', 'None'):
+                    value = None
+                values[position].append(value)
+        
+        # Drop trailing blank rows, as pandas does
+        length = max(
+            (i + 1 for position in columns for i, v in enumerate(values[position]) if v is not None),
+            default=0
+        )
+        truncated = bool(self.max_rows) and length > self.max_rows
+        if truncated:
+            length = self.max_rows
+        df = pd.DataFrame(
+            {header["names"][position]: pd.Series(values[position][:length], dtype=object) for position in columns}
+        )
+        df.attrs["header_row"] = header["row"]
+        df.attrs["truncated"] = truncated
+        return df
+    
+    @staticmethod
+    def _header_names(values: Sequence) -> List[str]:
+        """Name header cells the way pandas would (blank -> Unnamed: n, duplicates -> .1)"""
+        names = []
+        seen = {}
+        for position, value in enumerate(values):
+            name = str(value).strip() if value is not None and str(value).strip() else f"Unnamed: {position}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            names.append(name)
+        return names
+    
+    def _missing_columns_error(self, names: List[str]) -> str:
+        """missing_columns message listing at most HEADER_REPORT_LIMIT of the header names"""
+        limit = self.config.HEADER_REPORT_LIMIT
+        shown = names[:limit]
+        if len(names) > limit:
+            shown.append(f"... {len(names) - limit} more")
+        return self.config.ERROR_MESSAGES['missing_columns'].format(columns=shown)
+    
     def find_columns(self, df: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Optional[str], str]:
         """Find required columns in the dataframe"""
         df_columns = df.columns.tolist()
+        positions = self.column_resolver.resolve(df_columns)
         
-        payee_col = self._find_column_by_names(df_columns, self.supported_columns['payee'])
-        amount_col = self._find_column_by_names(df_columns, self.supported_columns['amount'])
-        work_col = self._find_column_by_names(df_columns, self.supported_columns['work'])
-        
-        if not all([payee_col, amount_col, work_col]):
-            error_msg = self.config.ERROR_MESSAGES['missing_columns'].format(
-                columns=list(df.columns)
-            )
-            return None, None, None, error_msg
+        if not all(positions[field] is not None for field in REQUIRED_FIELDS):
+            return None, None, None, self._missing_columns_error(list(df.columns))
         
-        return payee_col, amount_col, work_col, ""
+        return tuple(df_columns[positions[field]] for field in REQUIRED_FIELDS) + ("",)
     
-    def _find_column_by_names(self, df_columns: List[str], possible_names: List[str]) -> Optional[str]:
-        """Find column by possible names with early return optimization"""
-        for name in possible_names:
-            name_lower = name.lower()
-            for col in df_columns:
-                if name_lower in col.strip().lower():
-                    return col
-        return None
+    def process_data(self, df: pd.DataFrame, payee_col: str, amount_col: str, work_col: str) -> List[Receipt]:
+        """Build receipts from dataframe rows, dropping rows that fail validation"""
+        receipts, _ = self.process_rows(df, payee_col, amount_col, work_col)
+        return receipts
     
-    def process_data(self, df: pd.DataFrame, payee_col: str, amount_col: str, work_col: str) -> List[Dict]:
-        """Process dataframe rows efficiently"""
+    def process_rows(self, df: pd.DataFrame, payee_col: str, amount_col: str,
+                     work_col: str) -> Tuple[List[Receipt], List[Dict]]:
+        """Build receipts from dataframe rows, returning receipts and rejected rows.
+        
+        Amounts for the whole column are parsed up front by parse_amounts.
+        Rows with content that still fail validation are reported as
+        {"row", "error"} (plus "sheet" for multi-sheet reads); blank rows are
+        skipped silently.
+        """
         receipts = []
+        rejected = []
+        sheet = df.attrs.get("sheet")
+        amounts = parse_amounts(df[amount_col])
         
-        for _, row in df.iterrows():
-            receipt = self._process_row(row, payee_col, amount_col, work_col)
+        # Rows are numbered as in the spreadsheet, counting from below the header
+        first_row = df.attrs.get("header_row", 1) + 1
+        rows = zip(df[payee_col], df[amount_col], amounts, df[work_col])
+        for row_number, (payee_raw, amount_raw, amount, work_raw) in enumerate(rows, start=first_row):
+            receipt, error = self.build_receipt(payee_raw, amount_raw, work_raw, amount=amount)
             if receipt:
+                receipt.row = row_number
+                receipt.sheet = sheet
                 receipts.append(receipt)
+            elif not (_is_blank(payee_raw) and _is_blank(amount_raw) and _is_blank(work_raw)):
+                rejection = {"row": row_number, "error": error}
+                if sheet is not None:
+                    rejection["sheet"] = sheet
+                rejected.append(rejection)
         
-        return receipts
+        return receipts, rejected
     
-    def _process_row(self, row: pd.Series, payee_col: str, amount_col: str, work_col: str) -> Optional[Dict]:
-        """Process individual row with validation"""
-        try:
-            # Validate and convert amount
-            amount_raw = row[amount_col]
-            if pd.isna(amount_raw) or amount_raw == '':
-                return None
-            
-            amount = float(amount_raw)
-            if amount <= 0:
-                return None
-            
-            # Validate payee name
-            payee = str(row[payee_col]).strip()
-            if not payee or payee.lower() in ['nan', 'none', '']:
-                return None
+    def build_receipt(self, payee_raw, amount_raw, work_raw, amount: Optional[float] = None) -> Tuple[Optional[Receipt], str]:
+        """Validate raw payee/amount/work values and build a receipt.
+        
+        ``amount`` is the already parsed amount when the caller normalised a
+        whole column; otherwise ``amount_raw`` is parsed here.
+        """
+        # Validate and convert amount
+        if _is_blank(amount_raw):
+            return None, "Amount is missing"
+        
+        if amount is None:
+            amount = parse_amounts(pd.Series([amount_raw], dtype=object)).iloc[0]
+        if pd.isna(amount):
+            return None, f"Invalid amount: {amount_raw!r}"
+        if amount <= 0:
+            return None, "Amount must be greater than zero"
+        
+        # Validate payee name
+        payee = str(payee_raw).strip() if payee_raw is not None else ''
+        if not payee or payee.lower() in ['nan', 'none', '']:
+            return None, "Payee name is missing"
+        
+        # Process work description with default
+        work = str(work_raw).strip() if work_raw is not None else ''
+        if not work or work.lower() in ['nan', 'none', '']:
+            work = "Electric Work"
+        
+        return Receipt(payee, f"{amount:.2f}", convert_to_words(amount), work), ""
+    
+    def process_records(self, records: List[Dict]) -> Tuple[List[Receipt], List[Dict]]:
+        """Validate structured rows in bulk, returning receipts and per-row errors"""
+        receipts = []
+        errors = []
+        key_cache = {}
+        rows = []
+        
+        for index, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                errors.append({"row": index, "error": "Row must be a JSON object"})
+                continue
             
-            # Process work description with default
-            work = str(row[work_col]).strip()
-            if not work or work.lower() in ['nan', 'none', '']:
-                work = "Electric Work"
+            # Resolve field names once per distinct key layout
+            keys = tuple(record.keys())
+            if keys not in key_cache:
+                key_cache[keys] = self._resolve_record_keys(list(keys))
+            payee_key, amount_key, work_key = key_cache[keys]
             
-            return {
-                "payee": payee,
-                "amount": f"{amount:.2f}",
-                "amount_words": convert_to_words(amount),
-                "work": work
-            }
+            if payee_key is None or amount_key is None:
+                errors.append({"row": index, "error": "Row must contain payee and amount fields"})
+                continue
             
-        except (ValueError, TypeError, KeyError) as e:
-            logger.debug(f"Error processing row: {str(e)}")
-            return None
+            rows.append((index, record.get(payee_key), record.get(amount_key), record.get(work_key) if work_key else None))
+        
+        # Parse every amount in one pass, as for spreadsheet columns
+        amounts = parse_amounts(pd.Series([row[2] for row in rows], dtype=object))
+        for (index, payee_raw, amount_raw, work_raw), amount in zip(rows, amounts):
+            receipt, error = self.build_receipt(payee_raw, amount_raw, work_raw, amount=amount)
+            if receipt:
+                receipt.row = index
+                receipts.append(receipt)
+            else:
+                errors.append({"row": index, "error": error})
+        
+        errors.sort(key=lambda error: error["row"])
+        return receipts, errors
+    
+    def _resolve_record_keys(self, keys: List[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Map record keys to payee/amount/work, preferring the canonical names"""
+        positions = self.column_resolver.resolve(keys)
+        return tuple(
+            field if field in keys else (keys[positions[field]] if positions[field] is not None else None)
+            for field in REQUIRED_FIELDS
+        )
 
-@lru_cache(maxsize=128)
+@lru_cache(maxsize=4096)
 def convert_to_words(amount: float) -> str:
     """Cache number to words conversion for better performance"""
     return num2words(amount, lang='en').title()
@@ -126,21 +505,78 @@ class PDFGenerator:
         self.config = config
         self.pdf_options = config.PDF_OPTIONS
     
-    def generate_pdf(self, html_content: str, pdf_path: str) -> bool:
-        """Generate PDF from HTML content"""
+    def generate_pdf(self, html_content: Union[str, Iterable[str]], pdf_path: str) -> bool:
+        """Generate PDF from HTML content, a string or an iterable of chunks"""
         try:
-            import pdfkit
-            pdfkit.from_string(
-                html_content,
-                pdf_path,
-                options=self.pdf_options,
-                configuration=self._get_pdf_config()
-            )
+            self._run_wkhtmltopdf(html_content, pdf_path)
             return True
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
             return False
     
+    def generate_pdf_bytes(self, html_content: Union[str, Iterable[str]]) -> Optional[bytes]:
+        """Generate a PDF from HTML content (string or chunks) and return it in memory"""
+        try:
+            with tempfile.TemporaryFile() as output:
+                self._run_wkhtmltopdf(html_content, '-', stdout=output)
+                output.seek(0)
+                return output.read()
+        except Exception as e:
+            logger.error(f"Error generating PDF: {str(e)}")
+            return None
+    
+    def generate_png_bytes(self, html_content: Union[str, Iterable[str]], width: int, zoom: float) -> Optional[bytes]:
+        """Render HTML to a low-resolution PNG with wkhtmltoimage, for previews"""
+        command = [self._get_image_path(), '--quiet', '--format', 'png',
+                   '--width', str(width), '--zoom', str(zoom), '-', '-']
+        try:
+            with tempfile.TemporaryFile() as output:
+                self._pipe_html(command, html_content, stdout=output)
+                output.seek(0)
+                return output.read()
+        except Exception as e:
+            logger.error(f"Error generating preview image: {str(e)}")
+            return None
+    
+    def _run_wkhtmltopdf(self, html_content: Union[str, Iterable[str]], output_path: str, stdout=subprocess.DEVNULL):
+        """Convert HTML with wkhtmltopdf; the PDF goes to ``output_path`` ('-' writes it to ``stdout``)"""
+        import pdfkit
+        
+        # pdfkit builds the command line so options are handled exactly as before
+        command = pdfkit.PDFKit('', 'string', options=self.pdf_options,
+                                configuration=self._get_pdf_config()).command(output_path)
+        self._pipe_html(command, html_content, stdout)
+    
+    @staticmethod
+    def _pipe_html(command: List[str], html_content: Union[str, Iterable[str]], stdout):
+        """Pipe HTML into a wkhtmlto* command's stdin as it is produced.
+        
+        Chunks from ``Template.generate()`` are encoded and written through a
+        small buffer, so the full document is never held as one string.
+        """
+        chunks = [html_content] if isinstance(html_content, str) else html_content
+        
+        # stderr goes to a file: a full pipe would block wkhtmltopdf while we write
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=stdout, stderr=errors)
+            try:
+                with io.TextIOWrapper(process.stdin, encoding='utf-8') as stdin:
+                    for chunk in chunks:
+                        stdin.write(chunk)
+            except BrokenPipeError:
+                pass  # wkhtmltopdf exited early; its exit code says why
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            
+            returncode = process.wait()
+            errors.seek(0)
+            stderr = errors.read().decode('utf-8', errors='replace')
+        
+        if returncode != 0 or 'Error' in stderr:
+            raise IOError(f"{os.path.basename(command[0])} exited with code {returncode}: {stderr.strip()}")
+    
     def _get_pdf_config(self):
         """Get PDF configuration based on OS"""
         import os
@@ -152,6 +588,12 @@ class PDFGenerator:
             wkhtmltopdf_path = '/usr/bin/wkhtmltopdf'
         
         return pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+    
+    def _get_image_path(self) -> str:
+        """wkhtmltoimage ships alongside wkhtmltopdf"""
+        if os.name == 'nt':  # Windows
+            return 'C:/Program Files/wkhtmltopdf/bin/wkhtmltoimage.exe'
+        return '/usr/bin/wkhtmltoimage'
 
 class DataValidator:
     """Validates data integrity and format"""
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class WarmUp:
+    """Start-up steps that prime renderers and caches before real traffic arrives.
+
+    The first request after a restart otherwise pays for imports, template
+    compilation, font discovery and the first PDF backend start. Steps run
+    once, in order, on a background thread so the server accepts
+    connections meanwhile; ``ready`` only turns true once every step has
+    finished without error, which is what the readiness endpoint reports.
+    With ``WARMUP_ON_START`` off nothing runs and the process counts as
+    ready straight away.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.enabled = config.WARMUP_ON_START
+        self.steps = []
+        self.results = []
+        self.started = None
+        self.finished = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_step(self, name: str, func: Callable[[], object]):
+        self.steps.append((name, func))
+
+    def start(self):
+        """Run the steps on a daemon thread (once per process, and only if warm-up is enabled)"""
+        with self._lock:
+            if self.enabled and self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+                self._thread.start()
+
+    def run(self):
+        self.started = time.time()
+        for name, func in self.steps:
+            step_start = time.perf_counter()
+            result = {"name": name, "ok": True}
+            try:
+                func()
+            except Exception as e:
+                result.update(ok=False, error=str(e))
+                logger.error(f"Warm-up step '{name}' failed: {str(e)}")
+            result["seconds"] = round(time.perf_counter() - step_start, 3)
+            self.results.append(result)
+        self.finished = time.time()
+        logger.info(f"Warm-up finished in {self.duration:.2f}s: "
+                    + ", ".join(f"{r['name']} {r['seconds']}s{'' if r['ok'] else ' (failed)'}" for r in self.results))
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished; returns whether it is ready"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def ready(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.finished is not None and all(result["ok"] for result in self.results)
+
+    def status(self) -> Dict:
+        if not self.enabled:
+            state = "disabled"
+        elif self.ready:
+            state = "ready"
+        elif self.finished is not None:
+            state = "failed"
+        else:
+            state = "warming"
+        duration = self.duration
+        return {
+            "status": state,
+            "duration": round(duration, 3) if duration is not None else None,
+            "steps": self.results
+        }
@@ -0,0 +1,163 @@
+import logging
+import re
+import zipfile
+from typing import Optional, Tuple
+from xml.etree.ElementTree import XMLPullParser, ParseError, iterparse
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_CELL_REF = re.compile(r'^([A-Z]{1,3})(\d+)$')
+
+_ODS_TABLE_NS = 'urn:oasis:names:tc:opendocument:xmlns:table:1.0'
+_ODS_OFFICE_NS = 'urn:oasis:names:tc:opendocument:xmlns:office:1.0'
+_ODS_ROWS_REPEATED = f'{{{_ODS_TABLE_NS}}}number-rows-repeated'
+_ODS_COLUMNS_REPEATED = f'{{{_ODS_TABLE_NS}}}number-columns-repeated'
+_ODS_VALUE_TYPE = f'{{{_ODS_OFFICE_NS}}}value-type'
+
+def _column_number(letters: str) -> int:
+    """Convert spreadsheet column letters (A, Z, AA, ...) to a 1-based number"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + (ord(letter) - ord('A') + 1)
+    return number
+
+def parse_dimension(ref: str) -> Optional[Tuple[int, int]]:
+    """Return (rows, columns) covered by a sheet dimension such as ``A1:F250``"""
+    corners = ref.upper().split(':')
+    matches = [_CELL_REF.match(corner) for corner in corners]
+    if not all(matches):
+        return None
+    rows = [int(m.group(2)) for m in matches]
+    columns = [_column_number(m.group(1)) for m in matches]
+    return max(rows) - min(rows) + 1, max(columns) - min(columns) + 1
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+class WorkbookInspector:
+    """Checks an .xlsx or .ods archive against size limits before any parser allocates for it.
+
+    For .xlsx only the ZIP central directory and the first few KB of the
+    sheet and shared-strings parts are read: enough to see declared sheet
+    dimensions and string counts, so a small upload that would expand into
+    gigabytes (or millions of cells) is refused up front. An .ods declares
+    no dimensions, so its ``content.xml`` is streamed once to add up the
+    repeat counts of rows and cells that hold values.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    def inspect(self, file_stream) -> Tuple[bool, str]:
+        """Return (ok, error message); leaves the stream positioned at the start"""
+        try:
+            file_stream.seek(0)
+            with zipfile.ZipFile(file_stream) as archive:
+                return self._inspect_archive(archive)
+        except zipfile.BadZipFile:
+            return False, self.config.ERROR_MESSAGES['invalid_format']
+        except (ParseError, OSError, ValueError) as e:
+            logger.warning(f"Workbook inspection failed: {str(e)}")
+            return False, self.config.ERROR_MESSAGES['invalid_format']
+        finally:
+            file_stream.seek(0)
+
+    def _inspect_archive(self, archive: zipfile.ZipFile) -> Tuple[bool, str]:
+        entries = archive.infolist()
+        if len(entries) > self.config.MAX_ZIP_ENTRIES:
+            return False, self._limit_error('ZIP entries', len(entries), self.config.MAX_ZIP_ENTRIES)
+
+        total_size = sum(entry.file_size for entry in entries)
+        if total_size > self.config.MAX_UNCOMPRESSED_SIZE:
+            return False, self._limit_error('uncompressed bytes', total_size, self.config.MAX_UNCOMPRESSED_SIZE)
+
+        for entry in entries:
+            # Tiny parts compress extremely well legitimately, so only large ones are checked
+            ratio = entry.file_size / max(entry.compress_size, 1)
+            if entry.file_size > self.config.COMPRESSION_RATIO_MIN_SIZE and ratio > self.config.MAX_COMPRESSION_RATIO:
+                return False, self._limit_error(f'compression ratio of {entry.filename}', int(ratio), self.config.MAX_COMPRESSION_RATIO)
+
+        for entry in entries:
+            name = entry.filename
+            if name.startswith('xl/worksheets/') and name.endswith('.xml'):
+                attributes = self._first_element_attributes(archive, name, 'dimension', stop_at='sheetData')
+                dimension = parse_dimension(attributes.get('ref', '')) if attributes else None
+                if dimension:
+                    rows, columns = dimension
+                    if rows > self.config.MAX_SHEET_ROWS:
+                        return False, self._limit_error('rows', rows, self.config.MAX_SHEET_ROWS)
+                    if columns > self.config.MAX_SHEET_COLUMNS:
+                        return False, self._limit_error('columns', columns, self.config.MAX_SHEET_COLUMNS)
+            elif name == 'xl/sharedStrings.xml':
+                attributes = self._first_element_attributes(archive, name, 'sst') or {}
+                count = attributes.get('uniqueCount') or attributes.get('count') or '0'
+                if count.isdigit() and int(count) > self.config.MAX_SHARED_STRINGS:
+                    return False, self._limit_error('shared strings', int(count), self.config.MAX_SHARED_STRINGS)
+            elif name == 'content.xml':
+                ok, error_msg = self._inspect_ods_content(archive)
+                if not ok:
+                    return False, error_msg
+
+        return True, ""
+
+    def _inspect_ods_content(self, archive: zipfile.ZipFile) -> Tuple[bool, str]:
+        """Refuse ODS tables whose repeated rows or cells reach past the sheet limits.
+
+        Blank regions are stored as huge repeat counts and are fine; only the
+        extent up to the last row and column that hold a value is counted.
+        """
+        rows = 0
+        with archive.open('content.xml') as part:
+            for event, element in iterparse(part, events=('start', 'end')):
+                tag = _local_name(element.tag)
+                if event == 'start':
+                    if tag == 'table':
+                        rows = 0
+                    continue
+                if tag != 'table-row':
+                    continue
+
+                columns = last_column = 0
+                for cell in element:
+                    if _local_name(cell.tag) not in ('table-cell', 'covered-table-cell'):
+                        continue
+                    columns += int(cell.get(_ODS_COLUMNS_REPEATED, 1))
+                    if cell.get(_ODS_VALUE_TYPE) is not None or len(cell):
+                        last_column = columns
+                rows += int(element.get(_ODS_ROWS_REPEATED, 1))
+                element.clear()
+
+                if last_column > self.config.MAX_SHEET_COLUMNS:
+                    return False, self._limit_error('columns', last_column, self.config.MAX_SHEET_COLUMNS)
+                if last_column and rows > self.config.MAX_SHEET_ROWS:
+                    return False, self._limit_error('rows', rows, self.config.MAX_SHEET_ROWS)
+        return True, ""
+
+    def _first_element_attributes(self, archive: zipfile.ZipFile, name: str, element: str,
+                                  stop_at: Optional[str] = None) -> Optional[dict]:
+        """Stream a part until ``element`` starts and return its attributes.
+
+        Reading stops at ``stop_at`` or after INSPECT_READ_LIMIT bytes, so only
+        the head of the (possibly huge) part is ever decompressed.
+        """
+        parser = XMLPullParser(events=('start',))
+        read = 0
+        with archive.open(name) as part:
+            while read < self.config.INSPECT_READ_LIMIT:
+                chunk = part.read(4096)
+                if not chunk:
+                    break
+                read += len(chunk)
+                parser.feed(chunk)
+                for _, elem in parser.read_events():
+                    tag = _local_name(elem.tag)
+                    if tag == element:
+                        return dict(elem.attrib)
+                    if tag == stop_at:
+                        return None
+        return None
+
+    def _limit_error(self, what: str, value: int, limit: int) -> str:
+        return self.config.ERROR_MESSAGES['workbook_too_large'].format(what=what, value=value, limit=limit)
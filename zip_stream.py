@@ -0,0 +1,115 @@
+import io
+import re
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands out whatever was written since the last drain.
+
+    Because it cannot seek, ``zipfile`` writes each entry followed by a data
+    descriptor, so finished bytes can be sent to the client immediately.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive piece by piece as (name, data) entries arrive"""
+    sink = _StreamBuffer()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+def encode_chunks(chunks: Iterable[str], chunk_size: int, encoding: str = 'utf-8') -> Iterator[bytes]:
+    """Join small text chunks (e.g. from ``Template.generate()``) into encoded blocks of about ``chunk_size``"""
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= chunk_size:
+            yield ''.join(pending).encode(encoding)
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending).encode(encoding)
+
+def stream_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream piece by piece, for a ``Content-Encoding: gzip`` response"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def map_as_completed(func: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[Tuple[T, R]]:
+    """Run func over items in a thread pool, yielding (item, result) as each finishes.
+
+    At most ``2 * max_workers`` items are in flight, so results never pile up
+    faster than the consumer (e.g. a slow download) takes them.
+    """
+    items = iter(items)
+    window = max(1, max_workers * 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            if len(pending) >= window:
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                yield item, future.result()
+                next_item = next(items, None)
+                if next_item is not None:
+                    pending[executor.submit(func, next_item)] = next_item
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._ -]+')
+
+def safe_file_name(text: str, default: str = "receipt", max_length: int = 60) -> str:
+    """Reduce arbitrary text (e.g. a payee name) to a portable file name stem"""
+    stem = _UNSAFE_CHARS.sub("_", str(text)).strip(" ._")
+    return stem[:max_length].rstrip(" ._") or default
+
+def unique_name(stem: str, extension: str, used_names: Set[str]) -> str:
+    """Build ``stem.extension``, adding a counter if the name was already used"""
+    name = f"{stem}.{extension}"
+    counter = 2
+    while name in used_names:
+        name = f"{stem} ({counter}).{extension}"
+        counter += 1
+    used_names.add(name)
+    return name
+
+def receipt_file_name(receipt, used_names: Optional[Set[str]] = None) -> str:
+    """Name a per-receipt PDF from its source row number and payee"""
+    stem = f"{int(receipt.get('row', 0)):04d}_{safe_file_name(receipt.get('payee', ''))}"
+    if used_names is None:
+        return f"{stem}.pdf"
+    return unique_name(stem, "pdf", used_names)